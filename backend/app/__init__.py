@@ -1,22 +1,95 @@
 import os
-import requests
+import json
+import math
 import random
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 
 from backend.blockchain.blockchain import Blockchain
-from backend.pubsub.pubsub import PubSub
+from backend.blockchain.block_store import BlockStore
+from backend.blockchain.chain_sync import ChainSync, decode_locator
+from backend.blockchain.light_blockchain import LightBlockchain
+from backend.blockchain.codec import encode_chain
+from backend.blockchain.mining_queue import MiningQueue
+from backend.pubsub.pubsub import PubSub, transport_from_env
 from backend.wallet.wallet import Wallet
 from backend.wallet.transaction import Transaction
 from backend.wallet.transaction_pool import TransactionPool
+from backend.util.metrics import REGISTRY, Gauge
+from backend.config import (
+    BLOCK_SIZE_LIMIT,
+    MINING_JOB_MAX_WAIT,
+    SYNC_HEADERS_LIMIT,
+    SYNC_BLOCKS_LIMIT,
+)
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
 
-blockchain = Blockchain()
+ROOT_PORT = 5000
+ROOT_URL = f"http://127.0.0.1:{ROOT_PORT}"
+# a light node only keeps block headers and asks the root node for proven balances
+LIGHT = os.environ.get("LIGHT") == "True"
+LIGHT_ROUTES = {
+    "route_default",
+    "route_wallet_info",
+    "route_wallet_transact",
+    "route_metrics",
+}
+
+BLOCK_STORE_PATH = os.environ.get("BLOCK_STORE_PATH")
+if LIGHT:
+    blockchain = LightBlockchain(ROOT_URL)
+else:
+    blockchain = Blockchain(BlockStore(BLOCK_STORE_PATH) if BLOCK_STORE_PATH else None)
 wallet = Wallet(blockchain)
 transaction_pool = TransactionPool()
-pubsub = PubSub(blockchain=blockchain, transaction_pool=transaction_pool)
+pubsub = PubSub(
+    blockchain=blockchain,
+    transaction_pool=transaction_pool,
+    transport=transport_from_env(),
+    channels=() if LIGHT else None,
+)
+
+
+def mining_data():
+    """the pool transactions that fit in a block and the reward of this node"""
+    reward_data = Transaction.reward_transaction(wallet).serialize()
+    transaction_data = transaction_pool.select_transactions(
+        BLOCK_SIZE_LIMIT - len(json.dumps(reward_data))
+    )
+    transaction_data.append(reward_data)
+    return transaction_data
+
+
+def on_mined(block):
+    pubsub.broadcast_block(block)
+    transaction_pool.clear_blockchain_transactions(blockchain)
+
+
+mining_queue = None if LIGHT else MiningQueue(blockchain, mining_data, on_mined)
+
+Gauge(
+    "transaction_pool_transactions",
+    "Transactions waiting in the transaction pool",
+    function=lambda: len(transaction_pool.transaction_map),
+)
+Gauge(
+    "transaction_pool_bytes",
+    "Serialized size of the transactions in the transaction pool",
+    function=lambda: transaction_pool.total_bytes,
+)
+Gauge(
+    "blockchain_height",
+    "Blocks in the local chain, block headers on a light node",
+    function=lambda: len(blockchain if LIGHT else blockchain.chain),
+)
+
+
+@app.before_request
+def light_node_routes():
+    if LIGHT and request.endpoint not in LIGHT_ROUTES:
+        return jsonify({"error": "Not available on a light node"}), 404
 
 
 @app.route("/")
@@ -24,9 +97,32 @@ def route_default():
     return "Welcome to the blockchain"
 
 
+@app.route("/metrics")
+def route_metrics():
+    """metrics of the node in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/blockchain")
 def route_blockchain():
-    return jsonify(blockchain.serialize())
+    if request.args.get("format") == "binary":
+        return Response(
+            encode_chain(blockchain.serialize()), mimetype="application/octet-stream"
+        )
+    return Response(blockchain.iter_json(), mimetype="application/json")
+
+
+def conditional_json(etag, build):
+    """
+    Respond with 304 Not Modified when the client already has the tagged version,
+    the response body is only built otherwise
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    return response
 
 
 @app.route("/blockchain/range")
@@ -34,32 +130,85 @@ def rout_blockchain_range():
     start = int(request.args.get("start"))
     end = int(request.args.get("end"))
 
-    return jsonify(blockchain.serialize()[::-1][start:end])
+    return conditional_json(
+        blockchain.etag(), lambda: blockchain.serialize_range(start, end)
+    )
 
 
 @app.route("/blockchain/length")
 def route_blockchain_length():
-    return jsonify(len(blockchain.serialize()))
+    return conditional_json(blockchain.etag(), lambda: len(blockchain.chain))
+
+
+@app.route("/blockchain/headers")
+def route_blockchain_headers():
+    """
+    headers of the blocks after the last block shared with the given locator,
+    or from the given start height
+    """
+    locator = request.args.get("locator")
+    if locator is not None:
+        start = blockchain.fork_height(decode_locator(locator))
+    else:
+        start = int(request.args.get("start"))
+
+    return jsonify(
+        {
+            "start": start,
+            "height": len(blockchain.chain),
+            "headers": blockchain.headers(start, SYNC_HEADERS_LIMIT),
+        }
+    )
+
+
+@app.route("/blockchain/blocks")
+def route_blockchain_blocks():
+    start = int(request.args.get("start"))
+    end = min(int(request.args.get("end")), start + SYNC_BLOCKS_LIMIT)
+    return Response(blockchain.blocks_json(start, end), mimetype="application/json")
 
 
 @app.route("/blockchain/mine")
 def route_blockchain_mine():
-    transaction_data = transaction_pool.transaction_data()
-    transaction_data.append(Transaction.reward_transaction(wallet).serialize())
-    blockchain.add_block(transaction_data)
-    block = blockchain.chain[-1]
-    pubsub.broadcast_block(block)
-    transaction_pool.clear_blockchain_transactions(blockchain)
+    job = mining_queue.submit()
+    response = jsonify(job.serialize())
+    response.status_code = 202
+    response.headers["Location"] = f"/blockchain/mine/{job.id}"
+    return response
+
 
-    return jsonify(block.serialize())
+@app.route("/blockchain/mine/<job_id>")
+def route_blockchain_mine_job(job_id):
+    try:
+        wait = float(request.args.get("wait", 0))
+        if not 0 <= wait < math.inf:
+            raise ValueError(wait)
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+
+    job = mining_queue.wait(job_id, min(wait, MINING_JOB_MAX_WAIT))
+    if job is None:
+        return jsonify({"error": f"Unknown mining job {job_id}"}), 404
+
+    return jsonify(job.serialize())
 
 
 @app.route("/wallet/transact", methods=["POST"])
 def route_wallet_transact():
     transaction_data = request.get_json()
     print(transaction_data)
+    if LIGHT:
+        # a light node gets no blocks to clear its pool with, its transactions are
+        # dropped once the chain proves them so the next one is not an update of them
+        for transaction_json in blockchain.verified_transactions(wallet.address):
+            transaction_pool.remove_transaction(transaction_json["id"])
+
     transaction = transaction_pool.existing_transaction(wallet.address)
     if transaction:
+        # update a copy, so the pooled transaction is kept if the update is rejected
+        transaction = Transaction(
+            id=transaction.id, output=dict(transaction.output), input=transaction.input
+        )
         transaction.update(
             wallet, transaction_data["recipient"], transaction_data["amount"]
         )
@@ -67,6 +216,10 @@ def route_wallet_transact():
         transaction = Transaction(
             wallet, transaction_data["recipient"], transaction_data["amount"]
         )
+
+    if not transaction_pool.set_transaction(transaction):
+        return jsonify({"error": "The transaction pool is full"}), 503
+
     pubsub.broadcast_transactions(transaction)
     return jsonify(transaction.serialize())
 
@@ -76,13 +229,28 @@ def route_wallet_info():
     return jsonify({"address": wallet.address, "balance": wallet.balance})
 
 
+@app.route("/wallet/transactions")
+def route_wallet_transactions():
+    """
+    the transactions of the address with their inclusion proofs, for light nodes.
+    Encoded with json.dumps, as the proofs cover the transactions' key order
+    """
+    return Response(
+        json.dumps(blockchain.address_transactions(request.args.get("address"))),
+        mimetype="application/json",
+    )
+
+
 @app.route("/known-address")
 def route_known_address():
-    known_addresses = set()
-    for block in blockchain.chain:
-        for transac in block.data:
-            known_addresses.update(transac["output"].keys())
-    return jsonify(list(known_addresses))
+    limit = request.args.get("limit")
+    return jsonify(
+        blockchain.known_addresses(
+            request.args.get("prefix", ""),
+            int(request.args.get("offset", 0)),
+            int(limit) if limit is not None else None,
+        )
+    )
 
 
 @app.route("/transactions")
@@ -90,21 +258,25 @@ def rout_trnsactions():
     return jsonify(transaction_pool.transaction_data())
 
 
-ROOT_PORT = 5000
 PORT = ROOT_PORT
 # print(type(os.environ.get("PEER")))
-if os.environ.get("PEER") == "True":
+if LIGHT:
+    PORT = random.randint(5001, 6000)
+    try:
+        synced = blockchain.sync()
+        print(f"\n --Successfull Synced the block headers, {synced} new headers")
+    except Exception as e:
+        print(f"\n --Error Syncing: {e}")
+
+elif os.environ.get("PEER") == "True":
     PORT = random.randint(5001, 6000)
-    result = requests.get(f"http://127.0.0.1:{ROOT_PORT}/blockchain")
     try:
-        print(f"result.json(): {result.json()}")
-        result_blockchain = Blockchain.from_json(result.json())
-        blockchain.replace_chain(result_blockchain.chain)
-        print("\n --Successfull Synced the Local chain")
+        synced = ChainSync(blockchain, ROOT_URL).sync()
+        print(f"\n --Successfull Synced the Local chain, {synced} new blocks")
     except Exception as e:
         print(f"\n --Error Syncing: {e}")
 
-if os.environ.get("SEED_DATA") == "True":
+if os.environ.get("SEED_DATA") == "True" and not LIGHT:
     for i in range(10):
         blockchain.add_block(
             [
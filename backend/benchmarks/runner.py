@@ -0,0 +1,114 @@
+import json
+import time
+import platform
+from backend.config import SECONDS
+
+WARMUP = 1
+REPEAT = 10
+REGRESSION_THRESHOLD = 0.2
+
+
+class Benchmark:
+    """
+    A timed operation. setup is called before every run, untimed, and its result is
+    passed to function. Each sample times number calls of function
+    """
+
+    def __init__(self, name, function, setup=None, number=1) -> None:
+        self.name = name
+        self.function = function
+        self.setup = setup or (lambda: None)
+        self.number = number
+
+    def sample(self):
+        """Return the average seconds of one call over number calls"""
+        argument = self.setup()
+        start_time = time.perf_counter_ns()
+        for _ in range(self.number):
+            self.function(argument)
+        return (time.perf_counter_ns() - start_time) / SECONDS / self.number
+
+
+def percentile(samples, percent):
+    """The percentile of the samples, interpolated between the closest two"""
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples):
+    return {
+        "runs": len(samples),
+        "mean": sum(samples) / len(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "p50": percentile(samples, 50),
+        "p90": percentile(samples, 90),
+        "p99": percentile(samples, 99),
+    }
+
+
+def run_benchmark(benchmark, warmup=WARMUP, repeat=REPEAT):
+    """Run the benchmark warmup times untimed, then summarize repeat samples"""
+    for _ in range(warmup):
+        benchmark.sample()
+    return summarize([benchmark.sample() for _ in range(repeat)])
+
+
+def run_benchmarks(benchmarks, warmup=WARMUP, repeat=REPEAT, log=print):
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = run_benchmark(benchmark, warmup, repeat)
+        log(format_result(benchmark.name, results[benchmark.name]))
+    return results
+
+
+def format_result(name, result):
+    return (
+        f"{name:<48} p50: {result['p50'] * 1000:10.3f}ms "
+        f"p90: {result['p90'] * 1000:10.3f}ms mean: {result['mean'] * 1000:10.3f}ms"
+    )
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare the p50 of every benchmark with the baseline results.
+    Return the regressions, benchmarks more than threshold slower than their baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["p50"] / baseline[name]["p50"] if baseline[name]["p50"] else 1
+        if ratio > 1 + threshold:
+            regressions.append(
+                {
+                    "name": name,
+                    "baseline": baseline[name]["p50"],
+                    "p50": result["p50"],
+                    "ratio": ratio,
+                }
+            )
+    return regressions
+
+
+def save_results(path, results, parameters):
+    with open(path, "w") as results_file:
+        json.dump(
+            {
+                "timestamp": time.time_ns(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "parameters": parameters,
+                "results": results,
+            },
+            results_file,
+            indent=2,
+        )
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)["results"]
@@ -0,0 +1,230 @@
+"""
+Benchmarks of the hot paths of a node on a synthetic chain.
+
+    python -m backend.benchmarks.suite --blocks 50 --transactions 20 --output results.json
+    python -m backend.benchmarks.suite --baseline results.json
+
+Exits with 1 when a benchmark is slower than the baseline by more than the threshold
+"""
+import sys
+import json
+import argparse
+import itertools
+from backend.blockchain.block import Block
+from backend.blockchain.blockchain import Blockchain
+from backend.blockchain.codec import encode_chain, decode_chain
+from backend.benchmarks.runner import (
+    Benchmark,
+    WARMUP,
+    REPEAT,
+    REGRESSION_THRESHOLD,
+    run_benchmarks,
+    compare,
+    save_results,
+    load_results,
+)
+from backend.util.proof_of_work import defficulty_target, digest_meets_target
+from backend.wallet import wallet as wallet_module
+from backend.wallet.ledger import Ledger
+from backend.wallet.transaction import Transaction
+from backend.wallet.transaction_pool import TransactionPool
+from backend.wallet.wallet import Wallet
+from backend.config import MINE_RATE
+
+BLOCKS = 50
+TRANSACTIONS_PER_BLOCK = 20
+MINING_DEFFICULTY = 10
+RECIPIENTS = 10
+
+
+def mine_synthetic_block(last_block, data, height):
+    """
+    Mine a block timestamped one MINE_RATE after the last block, so the defficulty
+    goes down to 1 and long synthetic chains stay cheap to build
+    """
+    timestamp = last_block.timestamp + MINE_RATE
+    defficulty = Block.adjuest_defficulty(last_block, timestamp)
+    version = Block.version_at(height)
+    template, root = Block.hash_template(last_block, data, version)
+    target = defficulty_target(defficulty)
+
+    nonce = 0
+    digest = template.digest(timestamp, defficulty, nonce)
+    while not digest_meets_target(digest, target):
+        nonce += 1
+        digest = template.digest(timestamp, defficulty, nonce)
+
+    return Block(
+        timestamp, last_block.hash, digest.hex(), data, defficulty, nonce, version, root
+    )
+
+
+def build_blockchain(blocks, transactions_per_block, recipients):
+    """
+    A valid blockchain of blocks of signed transactions to the recipients and a mining
+    reward. Every transaction is sent by a new wallet
+    """
+    blockchain = Blockchain()
+    for i in range(blocks):
+        data = [
+            Transaction(Wallet(), recipients[j % len(recipients)], j + 1).serialize()
+            for j in range(transactions_per_block)
+        ]
+        data.append(Transaction.reward_transaction(Wallet()).serialize())
+        blockchain.append_block(
+            mine_synthetic_block(blockchain.chain[-1], data, len(blockchain.chain))
+        )
+    return blockchain
+
+
+def clear_signature_cache():
+    wallet_module.SIGNATURE_CACHE.clear()
+
+
+def cycling(items, function):
+    """Call function with the next of the items on every call, ignoring the argument"""
+    items = itertools.cycle(items)
+    return lambda argument: function(argument, next(items))
+
+
+def suite(
+    blocks=BLOCKS,
+    transactions_per_block=TRANSACTIONS_PER_BLOCK,
+    mining_defficulty=MINING_DEFFICULTY,
+):
+    """The benchmarks on a synthetic chain of the given size"""
+    wallet = Wallet()
+    recipients = [Wallet().address for _ in range(RECIPIENTS)]
+    blockchain = build_blockchain(blocks, transactions_per_block, recipients)
+    chain = blockchain.chain
+    chain_json = json.loads(json.dumps(blockchain.serialize()))
+    block_data = chain[-1].data
+
+    # mined blocks get the defficulty one below the last block, which is long past
+    mining_last_block = Block(0, "last_hash", "hash", [], mining_defficulty + 1, 0)
+
+    signed = [
+        (wallet.public_key, item["output"], wallet.sign(item["output"]))
+        for item in block_data
+    ]
+    transactions = [
+        Transaction(Wallet(), recipients[0], 1) for _ in range(transactions_per_block)
+    ]
+
+    def filled_pool():
+        transaction_pool = TransactionPool()
+        for transaction_json in block_data[:-1]:
+            transaction_pool.set_transaction(Transaction.from_json(transaction_json))
+        return transaction_pool
+
+    def cold_ledger():
+        blockchain.ledger = Ledger()
+
+    selection_pool = TransactionPool()
+    for transaction in transactions:
+        selection_pool.set_transaction(transaction)
+
+    return [
+        Benchmark(
+            "block.mine_block",
+            lambda _: Block.mine_block(mining_last_block, block_data),
+        ),
+        Benchmark(
+            "blockchain.is_valid_chain",
+            lambda _: Blockchain.is_valid_chain(chain),
+            setup=clear_signature_cache,
+        ),
+        Benchmark(
+            "blockchain.is_valid_chain.cached_signatures",
+            lambda _: Blockchain.is_valid_chain(chain),
+        ),
+        Benchmark(
+            "wallet.calculate_balance.cold",
+            lambda _: Wallet.calculate_balance(blockchain, recipients[0]),
+            setup=cold_ledger,
+        ),
+        Benchmark(
+            "wallet.calculate_balance",
+            lambda _: Wallet.calculate_balance(blockchain, recipients[0]),
+            number=1000,
+        ),
+        Benchmark(
+            "wallet.sign",
+            cycling(block_data, lambda _, item: wallet.sign(item["output"])),
+            number=len(block_data),
+        ),
+        Benchmark(
+            "wallet.verify",
+            cycling(signed, lambda _, item: Wallet.verify(*item)),
+            setup=clear_signature_cache,
+            number=len(signed),
+        ),
+        Benchmark(
+            "transaction_pool.set_transaction",
+            cycling(transactions, TransactionPool.set_transaction),
+            setup=TransactionPool,
+            number=len(transactions),
+        ),
+        Benchmark(
+            "transaction_pool.select_transactions",
+            lambda _: selection_pool.select_transactions(),
+        ),
+        Benchmark(
+            "transaction_pool.clear_blockchain_transactions",
+            lambda transaction_pool: transaction_pool.clear_blockchain_transactions(
+                blockchain
+            ),
+            setup=filled_pool,
+        ),
+        Benchmark(
+            "json.chain_round_trip",
+            lambda _: Blockchain.from_json(
+                json.loads(json.dumps(blockchain.serialize()))
+            ),
+        ),
+        Benchmark(
+            "codec.chain_round_trip",
+            lambda _: decode_chain(encode_chain(chain_json)),
+        ),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--blocks", type=int, default=BLOCKS)
+    parser.add_argument("--transactions", type=int, default=TRANSACTIONS_PER_BLOCK)
+    parser.add_argument("--defficulty", type=int, default=MINING_DEFFICULTY)
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--filter", default="", help="only run benchmarks named so")
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--baseline", help="compare with the results in this file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    benchmarks = [
+        benchmark
+        for benchmark in suite(args.blocks, args.transactions, args.defficulty)
+        if args.filter in benchmark.name
+    ]
+    results = run_benchmarks(benchmarks, args.warmup, args.repeat)
+
+    if args.output:
+        save_results(args.output, results, vars(args))
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['name']}: "
+                f"{regression['baseline'] * 1000:.3f}ms -> "
+                f"{regression['p50'] * 1000:.3f}ms ({regression['ratio']:.2f}x)"
+            )
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,38 @@
 """ blcok file """
 
 import time
-from backend.util.crypto_hash import crypto_hash
-from backend.util.hex_to_binary import hex_to_binry
-from backend.config import MINE_RATE
+import multiprocessing
+from backend.util.crypto_hash import crypto_hash, CryptoHashTemplate
+from backend.util.merkle import merkle_root, merkle_proof, verify_merkle_proof
+from backend.util.metrics import Counter, Gauge, Histogram
+from backend.util.proof_of_work import (
+    defficulty_target,
+    digest_meets_target,
+    meets_defficulty,
+)
+from backend.wallet.transaction import Transaction
+from backend.config import (
+    MINE_RATE,
+    MINING_WORKERS,
+    MINING_STOP_CHECK_INTERVAL,
+    BLOCK_VERSION_HEIGHTS,
+)
+
+# version 0 blocks hash their full data, version 1 blocks hash a header holding the
+# merkle root of their data
+BLOCK_VERSIONS = (0, 1)
+
+MINED_BLOCKS = Counter("mined_blocks_total", "Blocks mined by this node")
+MINING_SECONDS = Counter("mining_seconds_total", "Seconds spent mining blocks")
+HASH_ATTEMPTS = Counter(
+    "mining_hash_attempts_total", "Hashes tried while mining, the nonces searched"
+)
+ATTEMPTS_PER_BLOCK = Histogram(
+    "mining_attempts_per_block",
+    "Hashes tried to mine a block",
+    buckets=[4**exponent for exponent in range(1, 13)],
+)
+HASH_RATE = Gauge("mining_hash_rate", "Hashes per second of the last mined block")
 
 GENESIS_DATA = {
     "timestamp": 1,
@@ -20,43 +49,253 @@ class Block:
     Block: a unit of storage
 
     Store transactions in a blockchain that supports a cryptocurrency
+
+    The version is a consensus switch. Version 1 blocks carry the merkle root of their
+    data, so their hash, and the proof of work, only cover the fixed size header fields.
+    Blocks from the activation height of a version on, see BLOCK_VERSION_HEIGHTS, must
+    use it
     """
 
-    def __init__(self, timestamp, last_hash, hash, data, defficulty, nonce) -> None:
+    __slots__ = (
+        "timestamp",
+        "last_hash",
+        "hash",
+        "data",
+        "defficulty",
+        "nonce",
+        "version",
+        "merkle_root",
+    )
+
+    def __init__(
+        self,
+        timestamp,
+        last_hash,
+        hash,
+        data,
+        defficulty,
+        nonce,
+        version=0,
+        merkle_root=None,
+    ) -> None:
         self.timestamp = timestamp
         self.last_hash = last_hash
         self.hash = hash
         self.data = data
         self.defficulty = defficulty
         self.nonce = nonce
+        self.version = version
+        self.merkle_root = merkle_root
 
     def __repr__(self) -> str:
         return f"Block(timestamp: {self.timestamp}, lash_hash: {self.last_hash}, hash: {self.hash}, data: {self.data}), defficulty: {self.defficulty}, nonce: {self.nonce}"
 
     def __eq__(self, __o: object) -> bool:
-        return self.__dict__ == __o.__dict__
+        return self.serialize() == __o.serialize()
 
     def serialize(self):
-        return self.__dict__
+        block_json = {
+            "timestamp": self.timestamp,
+            "last_hash": self.last_hash,
+            "hash": self.hash,
+            "data": self.data,
+            "defficulty": self.defficulty,
+            "nonce": self.nonce,
+        }
+        if self.version:
+            block_json["version"] = self.version
+            block_json["merkle_root"] = self.merkle_root
+        return block_json
+
+    def header(self):
+        """the serialized block without its data"""
+        header = {
+            "timestamp": self.timestamp,
+            "last_hash": self.last_hash,
+            "hash": self.hash,
+            "defficulty": self.defficulty,
+            "nonce": self.nonce,
+        }
+        if self.version:
+            header["version"] = self.version
+            header["merkle_root"] = self.merkle_root
+        return header
+
+    def reconstructed_hash(self):
+        """the hash of the block fields, the merkle root is computed from the data"""
+        if self.version:
+            return crypto_hash(
+                self.timestamp,
+                self.last_hash,
+                Block.data_root(self.data),
+                self.nonce,
+                self.defficulty,
+                self.version,
+            )
+
+        return crypto_hash(
+            self.timestamp, self.last_hash, self.data, self.nonce, self.defficulty
+        )
+
+    def transaction_proof(self, transaction_id):
+        """
+        The inclusion proof of the transaction in a version 1 block, see merkle_proof.
+        None when the block does not contain the transaction
+        """
+        for index, transaction_json in enumerate(self.data):
+            if transaction_json["id"] == transaction_id:
+                return merkle_proof(self.data, index)
+        return None
 
     @staticmethod
-    def mine_block(last_block, data):
+    def data_root(data):
+        """merkle root of the block data, data that is not a list is a single item"""
+        return merkle_root(data if isinstance(data, list) else [data])
+
+    @staticmethod
+    def header_hash(header):
+        """the hash of a version 1 header, None for older versions"""
+        if not header.get("version"):
+            return None
+
+        return crypto_hash(
+            header["timestamp"],
+            header["last_hash"],
+            header["merkle_root"],
+            header["nonce"],
+            header["defficulty"],
+            header["version"],
+        )
+
+    @staticmethod
+    def verify_transaction_proof(header, transaction_json, proof):
+        """Check that the transaction is part of the block of the version 1 header"""
+        return bool(header.get("version")) and verify_merkle_proof(
+            transaction_json, proof, header["merkle_root"]
+        )
+
+    @staticmethod
+    def hash_template(last_block, data, version):
+        """
+        The hash template of a block to be mined on the last block and its merkle root,
+        the timestamp, defficulty and nonce are hashed in to it
+        """
+        if version:
+            root = Block.data_root(data)
+            return CryptoHashTemplate(last_block.hash, root, version), root
+        return CryptoHashTemplate(last_block.hash, data), None
+
+    @staticmethod
+    def mine_block(last_block, data, workers=None, height=None):
         """Mine a block based on a given last_block and data, until the block hash is found that meets
         the leading 0's proof of work requirement
+
+        When more than one worker is requested the nonce space is split across worker processes.
+        The height of the new block selects its version, see next_version
+        """
+        start_time = time.perf_counter()
+        workers = workers or MINING_WORKERS
+        if workers > 1:
+            block = Block.mine_block_parallel(last_block, data, workers, height)
+        else:
+            block = Block.mine_block_serial(last_block, data, height)
+
+        Block.observe_mining(block, time.perf_counter() - start_time)
+        return block
+
+    @staticmethod
+    def observe_mining(block, seconds):
         """
+        Record the mining metrics of the block. The nonces are tried in order, split
+        across the workers, so the attempts are the nonce of the mined block plus one
+        """
+        attempts = block.nonce + 1
+        MINED_BLOCKS.inc()
+        MINING_SECONDS.inc(seconds)
+        HASH_ATTEMPTS.inc(attempts)
+        ATTEMPTS_PER_BLOCK.observe(attempts)
+        if seconds:
+            HASH_RATE.set(attempts / seconds)
+
+    @staticmethod
+    def mine_block_serial(last_block, data, height=None):
+        """Mine a block on this process, see mine_block"""
         timestamp = time.time_ns()
         last_hash = last_block.hash
+        version = Block.next_version(last_block, height)
+        template, root = Block.hash_template(last_block, data, version)
         defficulty = Block.adjuest_defficulty(last_block, timestamp)
         nonce = 0
-        hash = crypto_hash(timestamp, last_hash, data, defficulty, nonce)
+        digest = template.digest(timestamp, defficulty, nonce)
 
-        while hex_to_binry(hash)[0:defficulty] != "0" * defficulty:
+        while not digest_meets_target(digest, defficulty_target(defficulty)):
             nonce += 1
             timestamp = time.time_ns()
             defficulty = Block.adjuest_defficulty(last_block, timestamp)
-            hash = crypto_hash(timestamp, last_hash, data, defficulty, nonce)
+            digest = template.digest(timestamp, defficulty, nonce)
 
-        return Block(timestamp, last_hash, hash, data, defficulty, nonce)
+        return Block(
+            timestamp, last_hash, digest.hex(), data, defficulty, nonce, version, root
+        )
+
+    @staticmethod
+    def mine_block_parallel(last_block, data, workers, height=None):
+        """
+        Mine a block by searching the nonce space on several processes.
+        Worker i tries the nonces i, i + workers, i + 2 * workers, ... and every worker
+        stops as soon as any of them finds a hash that meets the proof of work requirement
+        """
+        version = Block.next_version(last_block, height)
+        context = multiprocessing.get_context()
+        found = context.Event()
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=_mine_nonces,
+                args=(last_block, data, version, start_nonce, workers, found, results),
+                daemon=True,
+            )
+            for start_nonce in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            timestamp, hash, defficulty, nonce = results.get()
+        finally:
+            found.set()
+            for process in processes:
+                process.join()
+
+        return Block(
+            timestamp,
+            last_block.hash,
+            hash,
+            data,
+            defficulty,
+            nonce,
+            version,
+            Block.data_root(data) if version else None,
+        )
+
+    @staticmethod
+    def version_at(height):
+        """the block version required at the height, see BLOCK_VERSION_HEIGHTS"""
+        return max(
+            version
+            for version, activation_height in BLOCK_VERSION_HEIGHTS.items()
+            if activation_height is not None and height >= activation_height
+        )
+
+    @staticmethod
+    def next_version(last_block, height=None):
+        """
+        the version of a block mined at the height on top of the last block,
+        the version of the last block when the height is not known
+        """
+        if height is None:
+            return last_block.version
+        return Block.version_at(height)
 
     @staticmethod
     def genesis():
@@ -66,9 +305,13 @@ class Block:
     @staticmethod
     def from_json(block_json):
         """
-        Deserialize the json in to block instance
+        Deserialize the json in to block instance.
+        Transactions in the block data are stored in their compact form
         """
-        return Block(**block_json)
+        block = Block(**block_json)
+        if isinstance(block.data, list):
+            block.data = list(map(Transaction.compact_json, block.data))
+        return block
 
     @staticmethod
     def adjuest_defficulty(last_block, new_timestamp):
@@ -88,36 +331,64 @@ class Block:
         return 1
 
     @staticmethod
-    def is_valid_block(last_block, block):
+    def is_valid_block(last_block, block, height=None):
         """
         validate a block by enforcing by the following rules
         - the block must have the porper last_hash referenc
         - the block must meet the proof of work requierments
         - the deficulty must only adjuest by1
         - the block hash must be a valid combination of the block field
+        - the block version is the one activated at its height, when the height is
+          given, else it is known and never goes back
+        - the merkle root of a version 1 block matches its data
         """
 
+        if height is not None:
+            if block.version != Block.version_at(height):
+                raise Exception(
+                    f"The block version {block.version} is not valid at height {height}"
+                )
+        elif block.version not in BLOCK_VERSIONS or block.version < last_block.version:
+            raise Exception(f"The block version {block.version} is not valid")
+
         if block.last_hash != last_block.hash:
             raise Exception("The block last_hash must be correct")
 
-        if hex_to_binry(block.hash)[0 : block.defficulty] != "0" * block.defficulty:
+        if not meets_defficulty(block.hash, block.defficulty):
             raise Exception("The proof of requirement was not met")
 
         if abs(last_block.defficulty - block.defficulty) > 1:
             raise Exception("The block defficulty must only adjuest by 1")
 
-        reconstructed_hash = crypto_hash(
-            block.timestamp,
-            block.last_hash,
-            block.data,
-            block.nonce,
-            block.defficulty,
-        )
+        if block.version and block.merkle_root != Block.data_root(block.data):
+            raise Exception("The block merkle root must match its data")
 
-        if block.hash != reconstructed_hash:
+        if block.hash != block.reconstructed_hash():
             raise Exception("Block hash must be correct")
 
 
+def _mine_nonces(last_block, data, version, start_nonce, step, found, results):
+    """
+    Mining worker: try every step-th nonce from start_nonce until a valid hash is found
+    here or the found event is set by another worker
+    """
+    template, _ = Block.hash_template(last_block, data, version)
+    nonce = start_nonce
+
+    while not found.is_set():
+        for _ in range(MINING_STOP_CHECK_INTERVAL):
+            timestamp = time.time_ns()
+            defficulty = Block.adjuest_defficulty(last_block, timestamp)
+            digest = template.digest(timestamp, defficulty, nonce)
+
+            if digest_meets_target(digest, defficulty_target(defficulty)):
+                found.set()
+                results.put((timestamp, digest.hex(), defficulty, nonce))
+                return
+
+            nonce += step
+
+
 def main():
     gen_block = Block.genesis()
     bad_block = Block.mine_block(gen_block, "foo")
@@ -0,0 +1,207 @@
+import os
+import json
+import mmap
+import struct
+from backend.blockchain.block import Block
+from backend.blockchain.codec import encode_block, decode_block
+from backend.config import BLOCK_STORE_SYNC_EVERY, BLOCK_STORE_FORMAT
+
+RECORD_HEADER = struct.Struct("<I")
+INDEX_HASH_SIZE = 64
+INDEX_ENTRY = struct.Struct(f"<QI{INDEX_HASH_SIZE}s")
+
+
+class BlockStore:
+    """
+    Append-only on-disk log of blocks.
+
+    blocks.log holds the length prefixed serialized blocks. blocks.idx holds a fixed size
+    (offset, length, hash) entry per height so any block can be read back through the
+    memory mapped log without scanning it. Appends are fsynced in batches of sync_every.
+
+    Blocks are written as json or in the compact binary codec, records of both formats
+    can be read back from the same log
+    """
+
+    def __init__(
+        self, path, sync_every=BLOCK_STORE_SYNC_EVERY, wire_format=BLOCK_STORE_FORMAT
+    ) -> None:
+        os.makedirs(path, exist_ok=True)
+        self.log_path = os.path.join(path, "blocks.log")
+        self.index_path = os.path.join(path, "blocks.idx")
+        self.sync_every = sync_every
+        self.wire_format = wire_format
+        self.unsynced = 0
+
+        self.log = open(self.log_path, "ab")
+        self.index = open(self.index_path, "ab")
+        self.log_map = None
+        self.entries = []
+
+        self.recover()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def encode(self, block):
+        if self.wire_format == "binary":
+            return encode_block(block.serialize())
+        return json.dumps(block.serialize()).encode("utf-8")
+
+    def decode(self, payload):
+        if payload[:1] == b"{":
+            return Block.from_json(json.loads(payload))
+        return Block.from_json(decode_block(payload))
+
+    def recover(self):
+        """
+        Load the index and make it agree with the log after a crash.
+        Index entries past the end of the log are dropped, complete log records missing
+        from the index are indexed again and a partially written last record is cut off
+        """
+        log_size = os.path.getsize(self.log_path)
+        with open(self.index_path, "rb") as index_file:
+            index_data = index_file.read()
+        index_data = index_data[: len(index_data) - len(index_data) % INDEX_ENTRY.size]
+
+        entries = [
+            (offset, length, hash.rstrip(b"\0").decode("utf-8"))
+            for offset, length, hash in INDEX_ENTRY.iter_unpack(index_data)
+        ]
+        while entries and self.record_end(entries[-1]) > log_size:
+            entries.pop()
+        indexed_count = len(entries)
+
+        self.entries = entries
+        self.remap()
+        offset = self.record_end(entries[-1]) if entries else 0
+
+        while offset + RECORD_HEADER.size <= log_size:
+            (length,) = RECORD_HEADER.unpack_from(self.log_map, offset)
+            start = offset + RECORD_HEADER.size
+            if start + length > log_size:
+                break
+            try:
+                block = self.decode(self.log_map[start : start + length])
+            except Exception:
+                break
+            entries.append((offset, length, block.hash))
+            offset = start + length
+
+        if offset < log_size:
+            self.truncate_log(offset)
+
+        if indexed_count != len(entries) or len(index_data) != os.path.getsize(
+            self.index_path
+        ):
+            self.index.truncate(0)
+            for entry in entries:
+                self.write_index_entry(entry)
+            self.sync()
+
+    def record_end(self, entry):
+        offset, length, _ = entry
+        return offset + RECORD_HEADER.size + length
+
+    def remap(self):
+        """Map the current contents of the log for reading"""
+        if self.log_map is not None:
+            self.log_map.close()
+            self.log_map = None
+
+        self.log.flush()
+        if os.path.getsize(self.log_path):
+            with open(self.log_path, "rb") as log_file:
+                self.log_map = mmap.mmap(
+                    log_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+
+    def truncate_log(self, size):
+        if self.log_map is not None:
+            self.log_map.close()
+            self.log_map = None
+        self.log.flush()
+        self.log.truncate(size)
+        self.remap()
+
+    def write_index_entry(self, entry):
+        offset, length, hash = entry
+        self.index.write(INDEX_ENTRY.pack(offset, length, hash.encode("utf-8")))
+
+    def append(self, block):
+        """
+        Append the block to the log and index it at the next height.
+        Hashes are stored in a fixed size field, padded with zero bytes, so a hash that
+        would be cut off or lose trailing zero bytes is refused
+        """
+        hash_bytes = block.hash.encode("utf-8")
+        if len(hash_bytes) > INDEX_HASH_SIZE or hash_bytes.endswith(b"\0"):
+            raise Exception(f"The block hash {block.hash!r} does not fit the index")
+
+        payload = self.encode(block)
+        offset = self.record_end(self.entries[-1]) if self.entries else 0
+
+        self.log.write(RECORD_HEADER.pack(len(payload)))
+        self.log.write(payload)
+        entry = (offset, len(payload), block.hash)
+        self.write_index_entry(entry)
+        self.entries.append(entry)
+
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        """Flush and fsync the log and the index"""
+        for file in (self.log, self.index):
+            file.flush()
+            os.fsync(file.fileno())
+        self.unsynced = 0
+
+    def truncate(self, height):
+        """Drop every block from the given height onwards"""
+        if height >= len(self.entries):
+            return
+
+        offset = self.entries[height][0]
+        del self.entries[height:]
+        self.truncate_log(offset)
+        self.index.flush()
+        self.index.truncate(height * INDEX_ENTRY.size)
+        self.sync()
+
+    def hash(self, height):
+        return self.entries[height][2]
+
+    def read(self, height):
+        """Read the block at the given height"""
+        offset, length, _ = self.entries[height]
+        start = offset + RECORD_HEADER.size
+        if self.log_map is None or start + length > len(self.log_map):
+            self.remap()
+
+        return self.decode(self.log_map[start : start + length])
+
+    def read_chain(self, start=0):
+        """Read the blocks from the start height up to the tip"""
+        return [self.read(height) for height in range(start, len(self.entries))]
+
+    def write_chain(self, chain):
+        """
+        Make the store hold the given chain.
+        The stored blocks after the last block both chains share are replaced
+        """
+        height = min(len(self.entries), len(chain))
+        while height and self.hash(height - 1) != chain[height - 1].hash:
+            height -= 1
+
+        self.truncate(height)
+        for block in chain[height:]:
+            self.append(block)
+
+    def close(self):
+        self.sync()
+        if self.log_map is not None:
+            self.log_map.close()
+        self.log.close()
+        self.index.close()
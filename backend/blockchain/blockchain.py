@@ -1,23 +1,128 @@
 """ blockchain implementations """
+import json
+import time
+import itertools
+import threading
 from backend.blockchain.block import Block
+from backend.blockchain.chain_sync import locator_heights
 from backend.wallet.transaction import Transaction
-from backend.config import MINING_REWARD_INPUT, MINING_REWARD
-from backend.wallet.wallet import Wallet
+from backend.config import (
+    MINING_REWARD_INPUT,
+    MINING_REWARD,
+    BLOCK_JSON_CACHE_SIZE,
+    BLOCKCHAIN_STREAM_CHUNK,
+    SYNC_HEADERS_LIMIT,
+    VERIFY_BATCH_SIZE,
+)
+from backend.util.lru_cache import LRUCache
+from backend.util.metrics import Counter, Histogram
+from backend.wallet.ledger import Ledger
+from backend.wallet.address_index import AddressIndex
+
+REPLACE_CHAIN_SECONDS = Histogram(
+    "replace_chain_seconds", "Seconds to validate and replace the chain", ["result"]
+)
+VALIDATION_SECONDS = Histogram(
+    "is_valid_chain_seconds", "Seconds to validate an incoming chain"
+)
+VALIDATED_BLOCKS = Counter(
+    "validated_blocks_total", "Blocks validated, the blocks after a checkpoint"
+)
 
 
 class Blockchain:
     """
     Blockchain: a publick ledger of transactions.
     Implemented as a list of blocks - data sets of transactions
+
+    With a block store the chain is read back from disk and every change is persisted.
+    The stored chain was validated or mined by this node, so it becomes the checkpoint.
+    Blocks are appended by the mining thread while the chain can be replaced from
+    pubsub, so changes to the chain hold the lock
     """
 
-    def __init__(self) -> None:
+    def __init__(self, store=None) -> None:
         self.chain = [Block.genesis()]
+        self.ledger = Ledger()
+        self.addresses = AddressIndex()
+        self.store = store
+        self.json_cache = LRUCache(BLOCK_JSON_CACHE_SIZE)
+        self.lock = threading.RLock()
+
+        if self.store is not None:
+            if len(self.store):
+                self.chain = self.store.read_chain()
+            else:
+                self.store.write_chain(self.chain)
+
+        self.checkpoint = Ledger.from_chain(self.chain)
 
     def add_block(self, data):
         """adding data to blockchain"""
 
-        self.chain.append(Block.mine_block(self.chain[-1], data))
+        self.append_block(
+            Block.mine_block(self.chain[-1], data, height=len(self.chain))
+        )
+
+    def append_block(self, block):
+        """
+        append a block mined on top of the current tip.
+        The chain may have been replaced while the block was being mined
+        """
+        with self.lock:
+            if block.last_hash != self.chain[-1].hash:
+                raise Exception(
+                    "The block must be mined on the current tip of the chain"
+                )
+
+            self.chain.append(block)
+            if self.store is not None:
+                self.store.append(block)
+
+    def balance(self, address):
+        """
+        Look up the balance of the address in the ledger index.
+        Blocks added since the last lookup are applied to the index first
+        """
+        self.ledger.sync(self.chain)
+        return self.ledger.balance(address)
+
+    def known_addresses(self, prefix="", offset=0, limit=None):
+        """
+        Search the addresses that appear in the chain transactions, see AddressIndex.search.
+        Blocks added since the last search are indexed first
+        """
+        self.addresses.sync(self.chain)
+        return self.addresses.search(prefix, offset, limit)
+
+    def address_transactions(self, address):
+        """
+        The transactions the address sent or received in chain order, each with the
+        height and hash of its block and its inclusion proof. Transactions of blocks
+        older than version 1 have no proof
+        """
+        chain = self.chain
+        self.addresses.sync(chain)
+
+        address_transactions = []
+        for height, position in self.addresses.transaction_locations(address):
+            block = chain[height]
+            address_transactions.append(
+                {
+                    "height": height,
+                    "block_hash": block.hash,
+                    "transaction": block.data[position],
+                    "proof": block.transaction_proof(block.data[position]["id"])
+                    if block.version
+                    else None,
+                }
+            )
+        return address_transactions
+
+    def has_transaction(self, transaction_id):
+        """Check whether the transaction is already recorded in the chain"""
+        self.ledger.sync(self.chain)
+        return transaction_id in self.ledger.transaction_ids
 
     def __repr__(self) -> str:
         return f"Blockchain: {self.chain}"
@@ -28,22 +133,111 @@ class Blockchain:
 
         - The incoming chain is longer than the local one.
         - The incoming chain is formatted properly
-        """
-        if len(chain) <= len(self.chain):
-            raise Exception("Cannot replace, the incoming chain must be longer")
 
+        The checkpoint is the ledger of the longest prefix that has already been validated.
+        When both chains contain it, the local prefix is kept and only the incoming blocks
+        after it are validated
+        """
+        start_time = time.perf_counter()
         try:
-            Blockchain.is_valid_chain(chain)
-        except Exception as e:
-            raise Exception(f"Cannot replce. The incoming chain is invalid: {e}")
+            self.replace_validated_chain(chain)
+        except Exception:
+            REPLACE_CHAIN_SECONDS.labels("rejected").observe(
+                time.perf_counter() - start_time
+            )
+            raise
+        REPLACE_CHAIN_SECONDS.labels("replaced").observe(time.perf_counter() - start_time)
+
+    def replace_validated_chain(self, chain):
+        with self.lock:
+            if len(chain) <= len(self.chain):
+                raise Exception("Cannot replace, the incoming chain must be longer")
 
-        self.chain = chain
+            ledger = None
+            if self.checkpoint.is_prefix_of(
+                self.chain
+            ) and self.checkpoint.is_prefix_of(chain):
+                chain = (
+                    self.chain[: self.checkpoint.height]
+                    + chain[self.checkpoint.height :]
+                )
+                ledger = self.checkpoint.copy()
+
+            try:
+                ledger = Blockchain.is_valid_chain(chain, ledger)
+            except Exception as e:
+                raise Exception(f"Cannot replce. The incoming chain is invalid: {e}")
+
+            self.chain = chain
+            self.checkpoint = ledger
+            self.ledger = ledger.copy()
+            if self.store is not None:
+                self.store.write_chain(self.chain)
 
     def serialize(self):
         """serialize the blockchain in to loist of blocks"""
 
         return list(map(lambda block: block.serialize(), self.chain))
 
+    def block_json(self, block):
+        """
+        json encoding of the block. Blocks do not change once they are in the chain,
+        so each one is encoded once and cached by its hash
+        """
+        encoded = self.json_cache.get(block.hash)
+        if encoded is None:
+            encoded = json.dumps(block.serialize())
+            self.json_cache.put(block.hash, encoded)
+        return encoded
+
+    def iter_json(self, chunk_size=BLOCKCHAIN_STREAM_CHUNK):
+        """
+        Generate the json array of the serialized chain in chunks of chunk_size blocks
+        """
+        chain = self.chain
+        yield "["
+        for start in range(0, len(chain), chunk_size):
+            chunk = ",".join(map(self.block_json, chain[start : start + chunk_size]))
+            yield f",{chunk}" if start else chunk
+        yield "]"
+
+    def serialize_range(self, start, end):
+        """
+        serialize the [start:end] window of the chain in reverse order, newest block first.
+        Only the blocks in the window are touched
+        """
+        chain = self.chain
+        return [chain[i].serialize() for i in range(len(chain))[::-1][start:end]]
+
+    def blocks_json(self, start, end):
+        """json array of the [start:end] slice of the chain, oldest block first"""
+        return f"[{','.join(map(self.block_json, self.chain[start:end]))}]"
+
+    def locator(self):
+        """
+        (height, hash) pairs a peer can find the last block both chains share with,
+        see locator_heights
+        """
+        chain = self.chain
+        return [(height, chain[height].hash) for height in locator_heights(len(chain))]
+
+    def fork_height(self, locator):
+        """the number of blocks at the start of the chain the peer's locator shares"""
+        chain = self.chain
+        for height, hash in locator:
+            if height < len(chain) and chain[height].hash == hash:
+                return height + 1
+        return 0
+
+    def headers(self, start, limit=SYNC_HEADERS_LIMIT):
+        """headers of up to limit blocks from the start height"""
+        return [block.header() for block in self.chain[start : start + limit]]
+
+    def etag(self):
+        """tag of the current chain, it changes whenever a block is added or the chain is replaced"""
+        chain = self.chain
+        return f"{len(chain)}-{chain[-1].hash}"
+
     @staticmethod
     def from_json(chain_json):
         """
@@ -57,40 +251,71 @@ class Blockchain:
         return blockchain
 
     @staticmethod
-    def is_valid_chain(chain):
+    def is_valid_chain(chain, ledger=None):
         """
         Validate the incoming chain.
         Enforced the following rules of the blockchain
         - the chain starts with benesis block
         - block must be formatted correctly
+
+        Given the ledger of an already validated prefix, only the blocks after it are checked.
+        Return the ledger of the whole chain
         """
+        with VALIDATION_SECONDS.time():
+            return Blockchain.validate_chain(chain, ledger)
 
-        if chain[0] != Block.genesis():
+    @staticmethod
+    def validate_chain(chain, ledger):
+        if ledger is None:
+            ledger = Ledger()
+        if ledger.height == 0 and chain[0] != Block.genesis():
             raise Exception("The genesis block must be valid")
 
-        for i in range(1, len(chain)):
+        for i in range(max(ledger.height, 1), len(chain)):
             block = chain[i]
             last_block = chain[i - 1]
 
-            Block.is_valid_block(last_block, block)
+            Block.is_valid_block(last_block, block, i)
+        VALIDATED_BLOCKS.inc(len(chain) - ledger.height)
 
-        Blockchain.is_valid_transaction_chain(chain)
+        return Blockchain.is_valid_transaction_chain(chain, ledger)
 
     @staticmethod
-    def is_valid_transaction_chain(chain):
+    def is_valid_transaction_chain(chain, ledger=None):
         """
         Enforce the rules of the chain composed of blocks of transactions.
             - Each transaction must only appear once in the chain
             - There can be only on mining reward per block
             - Each transaction must be valid
+
+        The chain is walked once, input amounts are checked against a ledger holding the
+        balances of all the blocks before the current one. Given the ledger of a validated
+        prefix, the walk starts after it and the ledger is updated in place.
+
+        Signatures are verified ahead of the walk in parallel batches of VERIFY_BATCH_SIZE
+        transactions, the rules are still enforced in chain order. A chain that breaks a
+        rule early only pays for the batches up to that point
         """
 
-        transaction_ids = set()
+        ledger = ledger or Ledger()
+        transaction_ids = ledger.transaction_ids
 
-        for i in range(len(chain)):
-            block = chain[i]
+        upcoming = (
+            transaction_json
+            for block in chain[ledger.height :]
+            for transaction_json in block.data
+        )
+        unverified = 0
+
+        for block in chain[ledger.height :]:
             has_mining_reward = False
             for transaction_json in block.data:
+                if unverified == 0:
+                    batch = list(itertools.islice(upcoming, VERIFY_BATCH_SIZE))
+                    Transaction.verify_signatures(batch)
+                    unverified = len(batch)
+                unverified -= 1
+
                 transaction = Transaction.from_json(transaction_json)
 
                 if transaction.id in transaction_ids:
@@ -105,17 +330,17 @@ class Blockchain:
                         )
                     has_mining_reward = True
                 else:
-                    historic_blockchain = Blockchain()
-                    historic_blockchain.chain = chain[0:i]
-                    historic_balance = Wallet.calculate_balance(
-                        historic_blockchain, transaction.input["address"]
-                    )
+                    historic_balance = ledger.balance(transaction.input["address"])
                     if historic_balance != transaction.input["ammount"]:
                         raise Exception(
                             f"Transaction {transaction.id} has invalid input amount"
                         )
                 Transaction.is_valid_transaction(transaction)
 
+            ledger.apply_block(block)
+
+        return ledger
+
 
 def main():
     blockchain = Blockchain()
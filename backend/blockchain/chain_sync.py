@@ -0,0 +1,141 @@
+import requests
+from backend.blockchain.block import Block
+from backend.util.proof_of_work import meets_defficulty
+from backend.config import SYNC_BLOCKS_LIMIT
+
+
+def locator_heights(length):
+    """
+    Heights of a block locator of a chain of the given length: the last ten blocks,
+    then blocks exponentially further back, ending with genesis
+    """
+    heights = []
+    height = length - 1
+    step = 1
+    while height > 0:
+        heights.append(height)
+        if len(heights) >= 10:
+            step *= 2
+        height -= step
+    heights.append(0)
+    return heights
+
+
+def encode_locator(locator):
+    """query string form of a block locator: height:hash,height:hash"""
+    return ",".join(f"{height}:{hash}" for height, hash in locator)
+
+
+def decode_locator(text):
+    locator = []
+    for item in text.split(","):
+        height, hash = item.split(":", 1)
+        locator.append((int(height), hash))
+    return locator
+
+
+def http_fetcher(url):
+    """fetch(path, params) of the json responses of the node at the url"""
+
+    def fetch(path, params):
+        response = requests.get(f"{url}{path}", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    return fetch
+
+
+def check_headers(last_header, headers, height):
+    """
+    Check that the headers link up from the last header, meet their proof of work, only
+    adjust the defficulty by 1 and have the version activated at their height. Version 1
+    headers are hashed as well. The first header is at the height
+    """
+    for header_height, header in enumerate(headers, height):
+        if header["last_hash"] != last_header["hash"]:
+            raise Exception(
+                f"Header {header['hash']} does not link to {last_header['hash']}"
+            )
+        if not meets_defficulty(header["hash"], header["defficulty"]):
+            raise Exception(f"Header {header['hash']} does not meet its defficulty")
+        if abs(header["defficulty"] - last_header["defficulty"]) > 1:
+            raise Exception(f"Header {header['hash']} must only adjust defficulty by 1")
+        if header.get("version", 0) != Block.version_at(header_height):
+            raise Exception(
+                f"Header {header['hash']} is not version {Block.version_at(header_height)}"
+            )
+        if header.get("version") and Block.header_hash(header) != header["hash"]:
+            raise Exception(f"Header {header['hash']} does not match its fields")
+        last_header = header
+
+
+class ChainSync:
+    """
+    Brings the local chain up to date with a peer starting from the local tip.
+
+    The local block locator is sent to the peer, which answers with the headers of the
+    blocks after the last block both chains share. The headers are checked with
+    check_headers, then only the missing bodies are downloaded and the chain is replaced,
+    so replace_chain validates just the new blocks after its checkpoint.
+
+    fetch(path, params) returns the decoded json response of the peer
+    """
+
+    def __init__(self, blockchain, url=None, fetch=None, batch_size=SYNC_BLOCKS_LIMIT):
+        self.blockchain = blockchain
+        self.fetch = fetch or http_fetcher(url)
+        self.batch_size = batch_size
+
+    def fetch_headers(self):
+        """Return the height the headers start at and the headers up to the peer's tip"""
+        result = self.fetch(
+            "/blockchain/headers",
+            {"locator": encode_locator(self.blockchain.locator())},
+        )
+        start = result["start"]
+        headers = result["headers"]
+
+        while start + len(headers) < result["height"]:
+            result = self.fetch(
+                "/blockchain/headers", {"start": start + len(headers)}
+            )
+            if not result["headers"]:
+                break
+            headers += result["headers"]
+
+        return start, headers
+
+    def fetch_blocks(self, start, headers):
+        blocks = []
+        while len(blocks) < len(headers):
+            height = start + len(blocks)
+            blocks_json = self.fetch(
+                "/blockchain/blocks",
+                {"start": height, "end": height + self.batch_size},
+            )
+            if not blocks_json:
+                raise Exception(f"The peer has no block at height {height}")
+
+            for block_json in blocks_json[: len(headers) - len(blocks)]:
+                block = Block.from_json(block_json)
+                if block.header() != headers[len(blocks)]:
+                    raise Exception(f"Block {block.hash} does not match its header")
+                blocks.append(block)
+
+        return blocks
+
+    def sync(self):
+        """
+        Download and apply the blocks the peer has and the local chain is missing.
+        Return the number of blocks downloaded
+        """
+        start, headers = self.fetch_headers()
+        if start == 0:
+            raise Exception("The peer chain does not share the genesis block")
+        if start + len(headers) <= len(self.blockchain.chain):
+            return 0
+
+        check_headers(self.blockchain.chain[start - 1].header(), headers, start)
+        blocks = self.fetch_blocks(start, headers)
+        self.blockchain.replace_chain(self.blockchain.chain[:start] + blocks)
+        return len(blocks)
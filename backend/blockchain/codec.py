@@ -0,0 +1,398 @@
+"""
+Compact binary codec for the serialized (json) form of blocks and transactions.
+
+Every payload starts with the format version, format 2 adds the block version and
+merkle root to blocks. Values are tagged: integers are zigzag
+varints, lowercase hex strings (hashes, ids, addresses) are stored as raw bytes, PEM
+public keys as compressed secp256k1 points and signatures as two 32 byte integers.
+Anything that does not have the expected shape falls back to embedded json, so
+decoding always gives back exactly the json form that was encoded, key order included
+"""
+import json
+import struct
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives import serialization
+from backend.config import MINING_REWARD_INPUT, PUBLIC_KEY_CACHE_SIZE
+from backend.util.lru_cache import LRUCache
+
+FORMAT_VERSION = 2
+FORMAT_VERSIONS = (1, 2)
+
+TAG_JSON = 0
+TAG_INT = 1
+TAG_HEX = 2
+TAG_STR = 3
+TAG_FLOAT = 4
+TAG_POINT = 5
+
+TRANSACTION_JSON = 0
+TRANSACTION_SIGNED = 1
+TRANSACTION_REWARD = 2
+
+DATA_JSON = 0
+DATA_TRANSACTIONS = 1
+
+BLOCK_KEYS = ["timestamp", "last_hash", "hash", "data", "defficulty", "nonce"]
+VERSIONED_BLOCK_KEYS = BLOCK_KEYS + ["version", "merkle_root"]
+TRANSACTION_KEYS = ["id", "output", "input"]
+INPUT_KEYS = ["timestamp", "ammount", "address", "public_key", "signature"]
+HEX_DIGITS = set("0123456789abcdef")
+FLOAT = struct.Struct(">d")
+
+# compressed points by PEM public key, None for keys that do not round trip
+POINT_CACHE = LRUCache(PUBLIC_KEY_CACHE_SIZE)
+# PEM public keys by compressed point
+PEM_CACHE = LRUCache(PUBLIC_KEY_CACHE_SIZE)
+
+
+class Writer:
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def byte(self, value):
+        self.buffer.append(value)
+
+    def varint(self, value):
+        while value > 0x7F:
+            self.buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        self.buffer.append(value)
+
+    def blob(self, value):
+        self.varint(len(value))
+        self.buffer += value
+
+    def value(self, value):
+        if type(value) is int:
+            self.byte(TAG_INT)
+            self.varint(value << 1 if value >= 0 else (-value << 1) - 1)
+        elif type(value) is float:
+            self.byte(TAG_FLOAT)
+            self.buffer += FLOAT.pack(value)
+        elif type(value) is str and is_hex(value):
+            self.byte(TAG_HEX)
+            self.blob(bytes.fromhex(value))
+        elif type(value) is str:
+            self.byte(TAG_STR)
+            self.blob(value.encode("utf-8"))
+        else:
+            self.byte(TAG_JSON)
+            self.blob(json.dumps(value).encode("utf-8"))
+
+    def public_key(self, public_key):
+        point = public_key_point(public_key)
+        if point is None:
+            self.value(public_key)
+        else:
+            self.byte(TAG_POINT)
+            self.buffer += point
+
+    def output(self, output):
+        self.varint(len(output))
+        for address, ammount in output.items():
+            self.value(address)
+            self.value(ammount)
+
+    def transaction(self, transaction_json):
+        if is_reward_transaction(transaction_json):
+            self.byte(TRANSACTION_REWARD)
+            self.value(transaction_json["id"])
+            self.output(transaction_json["output"])
+        elif is_signed_transaction(transaction_json):
+            transaction_input = transaction_json["input"]
+            (r, s) = transaction_input["signature"]
+            self.byte(TRANSACTION_SIGNED)
+            self.value(transaction_json["id"])
+            self.output(transaction_json["output"])
+            self.value(transaction_input["timestamp"])
+            self.value(transaction_input["ammount"])
+            self.value(transaction_input["address"])
+            self.public_key(transaction_input["public_key"])
+            self.buffer += r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        else:
+            self.byte(TRANSACTION_JSON)
+            self.value(transaction_json)
+
+    def block(self, block_json):
+        if list(block_json) == BLOCK_KEYS:
+            version = 0
+        elif (
+            list(block_json) == VERSIONED_BLOCK_KEYS
+            and type(block_json["version"]) is int
+            and block_json["version"] > 0
+        ):
+            version = block_json["version"]
+        else:
+            raise Exception(f"Cannot encode block with fields {list(block_json)}")
+
+        self.value(block_json["timestamp"])
+        self.value(block_json["last_hash"])
+        self.value(block_json["hash"])
+        self.value(block_json["defficulty"])
+        self.value(block_json["nonce"])
+        self.varint(version)
+        if version:
+            self.value(block_json["merkle_root"])
+
+        data = block_json["data"]
+        if type(data) is list and all(type(item) is dict for item in data):
+            self.byte(DATA_TRANSACTIONS)
+            self.varint(len(data))
+            for transaction_json in data:
+                self.transaction(transaction_json)
+        else:
+            self.byte(DATA_JSON)
+            self.value(data)
+
+
+class Reader:
+    def __init__(self, payload) -> None:
+        self.payload = memoryview(payload)
+        self.position = 0
+        self.version = FORMAT_VERSION
+
+    def take(self, size):
+        if self.position + size > len(self.payload):
+            raise Exception("Truncated payload")
+        value = bytes(self.payload[self.position : self.position + size])
+        self.position += size
+        return value
+
+    def byte(self):
+        return self.take(1)[0]
+
+    def varint(self):
+        value = 0
+        shift = 0
+        while True:
+            part = self.byte()
+            value |= (part & 0x7F) << shift
+            if not part & 0x80:
+                return value
+            shift += 7
+
+    def blob(self):
+        return self.take(self.varint())
+
+    def value(self):
+        tag = self.byte()
+        if tag == TAG_INT:
+            value = self.varint()
+            return value >> 1 if not value & 1 else -((value + 1) >> 1)
+        if tag == TAG_FLOAT:
+            return FLOAT.unpack(self.take(FLOAT.size))[0]
+        if tag == TAG_HEX:
+            return self.blob().hex()
+        if tag == TAG_STR:
+            return self.blob().decode("utf-8")
+        if tag == TAG_JSON:
+            return json.loads(self.blob())
+        if tag == TAG_POINT:
+            return point_public_key(self.take(33))
+        raise Exception(f"Unknown value tag {tag}")
+
+    def output(self):
+        output = {}
+        for _ in range(self.varint()):
+            address = self.value()
+            output[address] = self.value()
+        return output
+
+    def transaction(self):
+        kind = self.byte()
+        if kind == TRANSACTION_JSON:
+            return self.value()
+
+        transaction_json = {"id": self.value(), "output": self.output()}
+        if kind == TRANSACTION_REWARD:
+            transaction_json["input"] = dict(MINING_REWARD_INPUT)
+            return transaction_json
+
+        transaction_json["input"] = {
+            "timestamp": self.value(),
+            "ammount": self.value(),
+            "address": self.value(),
+            "public_key": self.value(),
+            "signature": [
+                int.from_bytes(self.take(32), "big"),
+                int.from_bytes(self.take(32), "big"),
+            ],
+        }
+        return transaction_json
+
+    def block(self):
+        timestamp = self.value()
+        last_hash = self.value()
+        hash = self.value()
+        defficulty = self.value()
+        nonce = self.value()
+        version = self.varint() if self.version >= 2 else 0
+        merkle_root = self.value() if version else None
+
+        if self.byte() == DATA_TRANSACTIONS:
+            data = [self.transaction() for _ in range(self.varint())]
+        else:
+            data = self.value()
+
+        block_json = {
+            "timestamp": timestamp,
+            "last_hash": last_hash,
+            "hash": hash,
+            "data": data,
+            "defficulty": defficulty,
+            "nonce": nonce,
+        }
+        if version:
+            block_json["version"] = version
+            block_json["merkle_root"] = merkle_root
+        return block_json
+
+
+def is_hex(value):
+    return len(value) % 2 == 0 and len(value) > 0 and set(value) <= HEX_DIGITS
+
+
+def is_output(output):
+    return type(output) is dict and all(type(address) is str for address in output)
+
+
+def is_reward_transaction(transaction_json):
+    return (
+        list(transaction_json) == TRANSACTION_KEYS
+        and transaction_json["input"] == MINING_REWARD_INPUT
+        and list(transaction_json["input"]) == list(MINING_REWARD_INPUT)
+        and is_output(transaction_json["output"])
+    )
+
+
+def is_signed_transaction(transaction_json):
+    if list(transaction_json) != TRANSACTION_KEYS:
+        return False
+
+    transaction_input = transaction_json["input"]
+    if type(transaction_input) is not dict or list(transaction_input) != INPUT_KEYS:
+        return False
+
+    signature = transaction_input["signature"]
+    return (
+        is_output(transaction_json["output"])
+        and type(transaction_input["public_key"]) is str
+        and type(signature) in (list, tuple)
+        and len(signature) == 2
+        and all(type(part) is int and 0 <= part < 1 << 256 for part in signature)
+    )
+
+
+def public_key_point(public_key):
+    """
+    Return the compressed point of the PEM public key, or None when re-encoding the
+    point would not give back the same PEM string
+    """
+    if public_key in POINT_CACHE:
+        return POINT_CACHE.get(public_key)
+
+    try:
+        loaded_public_key = serialization.load_pem_public_key(
+            public_key.encode("utf-8")
+        )
+        point = loaded_public_key.public_bytes(
+            encoding=serialization.Encoding.X962,
+            format=serialization.PublicFormat.CompressedPoint,
+        )
+        if point_public_key(point) != public_key:
+            point = None
+    except (ValueError, TypeError, AttributeError):
+        point = None
+
+    POINT_CACHE.put(public_key, point)
+    return point
+
+
+def point_public_key(point):
+    """Return the PEM public key of the compressed secp256k1 point"""
+    public_key = PEM_CACHE.get(point)
+    if public_key is None:
+        public_key = (
+            ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256K1(), point)
+            .public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+            .decode("utf-8")
+        )
+        PEM_CACHE.put(point, public_key)
+
+    return public_key
+
+
+def encode(write, value):
+    writer = Writer()
+    writer.byte(FORMAT_VERSION)
+    write(writer, value)
+    return bytes(writer.buffer)
+
+
+def decode(read, payload):
+    reader = Reader(payload)
+    reader.version = reader.byte()
+    if reader.version not in FORMAT_VERSIONS:
+        raise Exception(f"Unsupported codec version {reader.version}")
+
+    value = read(reader)
+    if reader.position != len(reader.payload):
+        raise Exception("Unexpected data after the payload")
+    return value
+
+
+def encode_block(block_json):
+    """Encode the serialized block"""
+    return encode(Writer.block, block_json)
+
+
+def decode_block(payload):
+    """Decode a payload of encode_block back in to the serialized block"""
+    return decode(Reader.block, payload)
+
+
+def encode_transaction(transaction_json):
+    """Encode the serialized transaction"""
+    return encode(Writer.transaction, transaction_json)
+
+
+def decode_transaction(payload):
+    """Decode a payload of encode_transaction back in to the serialized transaction"""
+    return decode(Reader.transaction, payload)
+
+
+def encode_chain(chain_json):
+    """Encode a list of serialized blocks"""
+
+    def write_chain(writer, chain_json):
+        writer.varint(len(chain_json))
+        for block_json in chain_json:
+            writer.block(block_json)
+
+    return encode(write_chain, chain_json)
+
+
+def decode_chain(payload):
+    """Decode a payload of encode_chain back in to the list of serialized blocks"""
+    return decode(
+        lambda reader: [reader.block() for _ in range(reader.varint())], payload
+    )
+
+
+def main():
+    from backend.wallet.wallet import Wallet
+    from backend.wallet.transaction import Transaction
+
+    transaction_json = Transaction(Wallet(), "recipient", 15).serialize()
+    payload = encode_transaction(transaction_json)
+
+    print(f"json size: {len(json.dumps(transaction_json))}")
+    print(f"binary size: {len(payload)}")
+    print(f"decoded: {decode_transaction(payload)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from backend.blockchain.block import Block
+from backend.blockchain.chain_sync import (
+    ChainSync,
+    check_headers,
+    http_fetcher,
+    locator_heights,
+)
+from backend.wallet.ledger import Ledger
+
+
+class LightBlockchain:
+    """
+    Header-only view of the chain of a full node, for wallet-only nodes.
+
+    Only the block headers are synced and checked. Balances are calculated from the
+    transactions of the address the full node sends along with their inclusion proofs,
+    every proof is checked against the local headers. A full node can leave
+    transactions out but cannot make any up.
+
+    Blocks older than version 1 have no merkle root to prove a transaction against, for
+    those the whole block is fetched and hashed against its header instead. This keeps
+    light nodes working before version 1 is activated, at the cost of a block download
+    per block the address has transactions in
+
+    Stands in for Blockchain where only balances are needed, see Wallet.calculate_balance
+
+    fetch(path, params) returns the decoded json response of the full node
+    """
+
+    def __init__(self, url=None, fetch=None) -> None:
+        self.headers = [Block.genesis().header()]
+        self.fetch = fetch or http_fetcher(url)
+
+    def __len__(self):
+        return len(self.headers)
+
+    def locator(self):
+        """see Blockchain.locator"""
+        return [
+            (height, self.headers[height]["hash"])
+            for height in locator_heights(len(self.headers))
+        ]
+
+    def sync(self):
+        """
+        Download and check the headers of the blocks after the last one both chains
+        share. Return the number of headers added
+        """
+        start, headers = ChainSync(self, fetch=self.fetch).fetch_headers()
+        if start == 0:
+            raise Exception("The full node chain does not share the genesis block")
+        if start + len(headers) <= len(self.headers):
+            return 0
+
+        check_headers(self.headers[start - 1], headers, start)
+        self.headers = self.headers[:start] + headers
+        return len(headers)
+
+    def verified_transactions(self, address):
+        """
+        The transactions the address sent or received according to the full node.
+        Raise when a transaction is not proven to be in the local header chain
+        """
+        address_transactions = self.fetch("/wallet/transactions", {"address": address})
+        if any(item["height"] >= len(self.headers) for item in address_transactions):
+            self.sync()
+
+        last_height = 0
+        transactions = {}
+        blocks = {}
+        for item in address_transactions:
+            height = item["height"]
+            transaction_json = item["transaction"]
+            transaction_id = transaction_json["id"]
+            if not last_height <= height < len(self.headers):
+                raise Exception(f"Transaction at unknown height {height}")
+            if transaction_id in transactions:
+                raise Exception(f"Transaction {transaction_id} is not unique")
+            if address != transaction_json["input"]["address"] and (
+                address not in transaction_json["output"]
+            ):
+                raise Exception(f"Transaction {transaction_id} is not of {address}")
+            if not self.is_proven(height, transaction_json, item["proof"], blocks):
+                raise Exception(f"Transaction {transaction_id} is not proven")
+
+            last_height = height
+            transactions[transaction_id] = transaction_json
+
+        return list(transactions.values())
+
+    def is_proven(self, height, transaction_json, proof, blocks):
+        """
+        Check that the transaction is in the block at the height, by its inclusion proof
+        for a version 1 block or in the block data fetched from the full node otherwise.
+        Fetched blocks are kept in blocks by height
+        """
+        header = self.headers[height]
+        if header.get("version"):
+            return proof is not None and Block.verify_transaction_proof(
+                header, transaction_json, proof
+            )
+
+        if height not in blocks:
+            blocks_json = self.fetch(
+                "/blockchain/blocks", {"start": height, "end": height + 1}
+            )
+            if not blocks_json:
+                raise Exception(f"The full node has no block at height {height}")
+
+            block = Block.from_json(blocks_json[0])
+            if block.header() != header or block.reconstructed_hash() != header["hash"]:
+                raise Exception(f"Block {block.hash} does not match its header")
+            blocks[height] = blocks_json[0]["data"]
+
+        return transaction_json in blocks[height]
+
+    def balance(self, address):
+        """the balance of the address, calculated from its verified transactions"""
+        ledger = Ledger()
+        for transaction_json in self.verified_transactions(address):
+            ledger.apply_transaction(transaction_json)
+        return ledger.balance(address)
@@ -0,0 +1,102 @@
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from backend.blockchain.block import Block
+from backend.config import MINING_JOB_HISTORY
+
+
+class MiningJob:
+    """
+    A request to mine the next block, tracked from queued to done or failed
+    """
+
+    def __init__(self) -> None:
+        self.id = str(uuid.uuid4())[0:8]
+        self.status = "queued"
+        self.block = None
+        self.error = None
+        self.finished = threading.Event()
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "block": self.block.serialize() if self.block else None,
+            "error": self.error,
+        }
+
+
+class MiningQueue:
+    """
+    Mine blocks on a background worker thread instead of inside a request.
+
+    submit returns a job right away. When the worker starts a job it asks data_source for
+    the block data, mines it on top of the chain tip and calls on_mined with the block.
+    If the chain was replaced in the meantime the data is taken again and mined on the
+    new tip. The last history jobs are kept for status lookups
+    """
+
+    def __init__(
+        self, blockchain, data_source, on_mined=None, history=MINING_JOB_HISTORY
+    ) -> None:
+        self.blockchain = blockchain
+        self.data_source = data_source
+        self.on_mined = on_mined
+        self.history = history
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def submit(self):
+        """Queue a mining job and return it"""
+        job = MiningJob()
+        with self.lock:
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.history:
+                self.jobs.popitem(last=False)
+
+        self.queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def wait(self, job_id, timeout=None):
+        """Return the job once it is finished, or as it is when the timeout runs out"""
+        job = self.get(job_id)
+        if job is not None:
+            job.finished.wait(timeout)
+        return job
+
+    def run(self):
+        while True:
+            self.mine(self.queue.get())
+
+    def mine(self, job):
+        job.status = "mining"
+        try:
+            while True:
+                chain = self.blockchain.chain
+                last_block = chain[-1]
+                block = Block.mine_block(
+                    last_block, self.data_source(), height=len(chain)
+                )
+                with self.blockchain.lock:
+                    if self.blockchain.chain[-1] is last_block:
+                        self.blockchain.append_block(block)
+                        break
+
+            if self.on_mined:
+                self.on_mined(block)
+
+            job.block = block
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished.set()
@@ -7,3 +7,48 @@ MINE_RATE = 4 * SECONDS
 STARTING_BALANCE = 1000
 MINING_REWARD = 50
 MINING_REWARD_INPUT = {"address": "*--official-minig-reward--*"}
+
+MINING_WORKERS = 1
+MINING_STOP_CHECK_INTERVAL = 1000
+
+PUBLIC_KEY_CACHE_SIZE = 1024
+SIGNATURE_CACHE_SIZE = 100000
+
+VERIFY_WORKERS = 1
+PARALLEL_VERIFY_THRESHOLD = 64
+# signatures verified ahead of the chain walk at a time, well below SIGNATURE_CACHE_SIZE
+VERIFY_BATCH_SIZE = 1024
+
+BLOCK_STORE_SYNC_EVERY = 16
+
+PUBSUB_WIRE_FORMAT = "json"
+BLOCK_STORE_FORMAT = "json"
+
+TRANSACTION_POOL_LIMIT = 10000
+TRANSACTION_POOL_MAX_BYTES = 16 * 1024 * 1024
+TRANSACTION_POOL_MAX_AGE = 24 * 60 * 60 * SECONDS
+BLOCK_SIZE_LIMIT = 1024 * 1024
+
+BLOCK_JSON_CACHE_SIZE = 100000
+BLOCKCHAIN_STREAM_CHUNK = 100
+
+MINING_JOB_HISTORY = 1000
+MINING_JOB_MAX_WAIT = 30
+
+PUBSUB_ASYNC_PUBLISH = True
+PUBLISH_QUEUE_SIZE = 10000
+PUBLISH_QUEUE_TIMEOUT = 1
+PUBLISH_BATCH_SIZE = 100
+# PubNub rejects publishes over 32KB, counted on the url encoded message
+PUBLISH_BATCH_MAX_BYTES = 16000
+
+SYNC_HEADERS_LIMIT = 2000
+SYNC_BLOCKS_LIMIT = 100
+
+BLOCK_RELAY = "compact"
+COMPACT_BLOCK_PENDING_LIMIT = 100
+COMPACT_BLOCK_CACHE_SIZE = 100
+
+# height of the first block of each block version. Version 1 is not scheduled yet, every
+# node of the network has to run the same heights before it is
+BLOCK_VERSION_HEIGHTS = {0: 0, 1: None}
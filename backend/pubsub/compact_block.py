@@ -0,0 +1,76 @@
+from backend.blockchain.block import Block
+from backend.config import MINING_REWARD_INPUT, COMPACT_BLOCK_PENDING_LIMIT
+
+
+def is_compactable(block):
+    """only blocks of transactions can be relayed by their transaction ids"""
+    return isinstance(block.data, list) and all(
+        isinstance(transaction_json, dict) and "id" in transaction_json
+        for transaction_json in block.data
+    )
+
+
+def compact_block(block, origin):
+    """
+    The header of the block and the ids of its transactions in block order.
+    Mining rewards are never gossiped, so they are sent along in full
+    """
+    return {
+        "origin": origin,
+        "header": block.header(),
+        "transaction_ids": [transaction_json["id"] for transaction_json in block.data],
+        "prefilled": [
+            transaction_json
+            for transaction_json in block.data
+            if transaction_json["input"] == MINING_REWARD_INPUT
+        ],
+    }
+
+
+def rebuild_block(message, transactions):
+    """The block of a compact block given the serialized transactions by id"""
+    data = [
+        transactions[transaction_id] for transaction_id in message["transaction_ids"]
+    ]
+    return Block.from_json({**message["header"], "data": data})
+
+
+class PendingBlocks:
+    """
+    Compact blocks waiting for the transactions that were not in the pool.
+    At most limit blocks are kept, the oldest one is dropped first
+    """
+
+    def __init__(self, limit=COMPACT_BLOCK_PENDING_LIMIT) -> None:
+        self.limit = limit
+        self.blocks = {}
+
+    def __contains__(self, block_hash):
+        return block_hash in self.blocks
+
+    def add(self, message, transactions):
+        block_hash = message["header"]["hash"]
+        self.blocks[block_hash] = (message, transactions)
+        while len(self.blocks) > self.limit:
+            del self.blocks[next(iter(self.blocks))]
+
+    def fill(self, block_hash, transaction_jsons):
+        """
+        Add the received transactions to the pending block.
+        Return the message and the transactions by id once none are missing
+        """
+        if block_hash not in self.blocks:
+            return None
+
+        message, transactions = self.blocks[block_hash]
+        for transaction_json in transaction_jsons:
+            transactions[transaction_json["id"]] = transaction_json
+
+        if any(
+            transaction_id not in transactions
+            for transaction_id in message["transaction_ids"]
+        ):
+            return None
+
+        del self.blocks[block_hash]
+        return message, transactions
@@ -0,0 +1,162 @@
+import json
+import queue
+import threading
+import time
+from backend.config import (
+    PUBLISH_QUEUE_SIZE,
+    PUBLISH_QUEUE_TIMEOUT,
+    PUBLISH_BATCH_SIZE,
+    PUBLISH_BATCH_MAX_BYTES,
+    SECONDS,
+)
+from backend.util.metrics import Counter, Gauge, Histogram
+
+PUBLISH_LATENCY = Histogram(
+    "pubsub_publish_latency_seconds",
+    "Seconds from broadcasting a message to handing it to the transport",
+    ["channel"],
+)
+PUBLISH_QUEUE_DEPTH = Gauge(
+    "pubsub_publish_queue_depth", "Messages waiting in the publish queues"
+)
+PUBLISH_FAILURES = Counter(
+    "pubsub_publish_failures_total", "Messages the transport failed to publish"
+)
+
+
+class PublishQueue:
+    """
+    Publishes messages from a background sender thread, so callers do not wait on the
+    transport.
+
+    The queue is bounded: when it is full put blocks for up to timeout seconds, then
+    raises. Batchable messages queued back to back on the same channel are sent together
+    as one {"batch": [...]} message of at most batch_size messages and batch_bytes bytes
+    of json. A message over batch_bytes is sent on its own. Message order is kept
+    """
+
+    def __init__(
+        self,
+        transport,
+        max_size=PUBLISH_QUEUE_SIZE,
+        timeout=PUBLISH_QUEUE_TIMEOUT,
+        batch_size=PUBLISH_BATCH_SIZE,
+        batch_bytes=PUBLISH_BATCH_MAX_BYTES,
+    ) -> None:
+        self.transport = transport
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.queue = queue.Queue(max_size)
+
+        self.lock = threading.Lock()
+        self.published = 0
+        self.batches = 0
+        self.failed = 0
+        self.latency_total = 0
+        self.latency_max = 0
+
+        self.sender = threading.Thread(target=self.run, daemon=True)
+        self.sender.start()
+
+    def put(self, channel, message, batchable=False):
+        """
+        Queue the message for publishing. The depth is counted before the put, the
+        worker may take the message and decrement it as soon as it is queued
+        """
+        PUBLISH_QUEUE_DEPTH.inc()
+        try:
+            self.queue.put(
+                (channel, message, batchable, time.time_ns()), timeout=self.timeout
+            )
+        except queue.Full:
+            PUBLISH_QUEUE_DEPTH.dec()
+            raise Exception("The publish queue is full")
+
+    def flush(self):
+        """Wait until every queued message has been published"""
+        self.queue.join()
+
+    def take(self):
+        """Take the next message and the ones queued behind it, up to a batch"""
+        items = [self.queue.get()]
+        while len(items) < self.batch_size:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def run(self):
+        while True:
+            items = self.take()
+            sizes = [None] * len(items)
+            start = 0
+            while start < len(items):
+                channel, message, batchable, _ = items[start]
+                end = start + 1
+                if batchable:
+                    batch_bytes = len('{"batch": []}') + self.size(items, sizes, start)
+                    while (
+                        end < len(items) and items[end][0] == channel and items[end][2]
+                    ):
+                        batch_bytes += len(", ") + self.size(items, sizes, end)
+                        if batch_bytes > self.batch_bytes:
+                            break
+                        end += 1
+
+                group = items[start:end]
+                if len(group) > 1:
+                    message = {"batch": [item[1] for item in group]}
+                self.send(channel, message, group)
+                start = end
+
+    @staticmethod
+    def size(items, sizes, index):
+        """bytes of json of the message of the item at the index, computed once"""
+        if sizes[index] is None:
+            sizes[index] = len(json.dumps(items[index][1]))
+        return sizes[index]
+
+    def send(self, channel, message, group):
+        try:
+            self.transport.publish(channel, message)
+            failed = False
+        except Exception as e:
+            print(f"\n -- Could not publish to {channel}: {e}")
+            failed = True
+
+        now = time.time_ns()
+        with self.lock:
+            if failed:
+                self.failed += len(group)
+            else:
+                self.published += len(group)
+                self.batches += 1
+            for item in group:
+                latency = now - item[3]
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+
+        latency_histogram = PUBLISH_LATENCY.labels(channel)
+        for item in group:
+            latency_histogram.observe((now - item[3]) / SECONDS)
+        if failed:
+            PUBLISH_FAILURES.inc(len(group))
+        PUBLISH_QUEUE_DEPTH.dec(len(group))
+
+        for item in group:
+            self.queue.task_done()
+
+    def stats(self):
+        """Queue depth, publish counts and enqueue to publish latency in seconds"""
+        with self.lock:
+            sent = self.published + self.failed
+            return {
+                "queue_depth": self.queue.qsize(),
+                "published": self.published,
+                "batches": self.batches,
+                "failed": self.failed,
+                "latency_avg": self.latency_total / sent / SECONDS if sent else 0,
+                "latency_max": self.latency_max / SECONDS,
+            }
@@ -1,79 +1,309 @@
-from pubnub.pubnub import PubNub
-from pubnub.pnconfiguration import PNConfiguration
-from pubnub.callbacks import SubscribeCallback
+import os
 import time
+import uuid
+import base64
 from backend.blockchain.block import Block
+from backend.blockchain.codec import (
+    encode_block,
+    decode_block,
+    encode_transaction,
+    decode_transaction,
+)
 from backend.wallet.transaction import Transaction
+from backend.pubsub.transport import PubNubTransport, SocketTransport
+from backend.pubsub.publish_queue import PublishQueue, PUBLISH_LATENCY
+from backend.pubsub.compact_block import (
+    is_compactable,
+    compact_block,
+    rebuild_block,
+    PendingBlocks,
+)
+from backend.util.lru_cache import LRUCache
+from backend.util.metrics import Histogram
+from backend.config import (
+    PUBSUB_WIRE_FORMAT,
+    PUBSUB_ASYNC_PUBLISH,
+    BLOCK_RELAY,
+    COMPACT_BLOCK_CACHE_SIZE,
+)
 
 
-pnconfig = PNConfiguration()
-pnconfig.subscribe_key = "sub-c-0b640abe-eb80-4ef4-b9db-6d2536504fee"
-pnconfig.publish_key = "pub-c-65116574-c305-45fc-a0f1-5e31234b048e"
+CHANNELS = {
+    "TEST": "TEST",
+    "BLOCK": "BLOCK",
+    "TRANSACTION": "TRANSACTION",
+    "COMPACT_BLOCK": "COMPACT_BLOCK",
+    "GET_TRANSACTIONS": "GET_TRANSACTIONS",
+    "BLOCK_TRANSACTIONS": "BLOCK_TRANSACTIONS",
+    "GET_BLOCK": "GET_BLOCK",
+}
 
 
-CHANNELS = {"TEST": "TEST", "BLOCK": "BLOCK", "TRANSACTION": "TRANSACTION"}
+RECEIVE_SECONDS = Histogram(
+    "pubsub_receive_seconds", "Seconds to handle a received message", ["channel"]
+)
 
 
-class Listner(SubscribeCallback):
-    def __init__(self, blockchain, transaction_pool) -> None:
+def pack_message(encode, message_json, wire_format):
+    """
+    Wrap the serialized object for publishing. Binary payloads are base64 encoded,
+    as messages must be json
+    """
+    if wire_format == "binary":
+        return {
+            "encoding": "binary",
+            "payload": base64.b64encode(encode(message_json)).decode("ascii"),
+        }
+    return message_json
+
+
+def unpack_message(decode, message):
+    """Return the serialized object of a message in any wire format"""
+    if isinstance(message, dict) and message.get("encoding") == "binary":
+        return decode(base64.b64decode(message["payload"]))
+    return message
+
+
+def transport_from_env():
+    """
+    The transport selected by the PUBSUB_BROKER environment variable: a host:port of a
+    socket broker, or PubNub when it is not set
+    """
+    broker = os.environ.get("PUBSUB_BROKER")
+    if broker:
+        host, port = broker.rsplit(":", 1)
+        return SocketTransport(host, int(port))
+
+    return PubNubTransport()
+
+
+class Listner:
+    """
+    Handles the messages of every channel.
+
+    A compact block is rebuilt from the transaction pool. The transactions missing from
+    the pool are requested from the node that relayed the block, and when the rebuilt
+    block does not hash to the relayed hash the full block is requested instead
+    """
+
+    def __init__(self, blockchain, transaction_pool, pubsub=None) -> None:
         self.blockchain = blockchain
         self.transaction_pool = transaction_pool
+        self.pubsub = pubsub
+        self.pending_blocks = PendingBlocks()
+
+    def message(self, channel, message):
+        print(f"\n-- Channel: {channel} | Message: {message}")
+        if isinstance(message, dict) and "batch" in message:
+            messages = message["batch"]
+        else:
+            messages = [message]
+
+        receive_seconds = RECEIVE_SECONDS.labels(channel)
+        for message in messages:
+            with receive_seconds.time():
+                self.handle(channel, message)
+
+    def handle(self, channel, message):
+        if channel == CHANNELS["BLOCK"]:
+            self.add_block(Block.from_json(unpack_message(decode_block, message)))
+
+        elif channel == CHANNELS["COMPACT_BLOCK"]:
+            self.receive_compact_block(message)
 
-    def message(self, pubnub, message_object):
-        print(
-            f"\n-- Channel: {message_object.channel} | Message: {message_object.message}"
+        elif channel == CHANNELS["BLOCK_TRANSACTIONS"]:
+            filled = self.pending_blocks.fill(
+                message["block_hash"], message["transactions"]
+            )
+            if filled:
+                self.rebuild_compact_block(*filled)
+
+        elif channel == CHANNELS["GET_TRANSACTIONS"]:
+            block = self.relayed_block(message)
+            if block:
+                wanted = set(message["transaction_ids"])
+                self.pubsub.publish(
+                    CHANNELS["BLOCK_TRANSACTIONS"],
+                    {
+                        "block_hash": block.hash,
+                        "transactions": [
+                            transaction_json
+                            for transaction_json in block.data
+                            if transaction_json["id"] in wanted
+                        ],
+                    },
+                )
+
+        elif channel == CHANNELS["GET_BLOCK"]:
+            block = self.relayed_block(message)
+            if block:
+                self.pubsub.broadcast_full_block(block)
+
+        elif channel == CHANNELS["TRANSACTION"]:
+            transaction = Transaction.from_json(
+                unpack_message(decode_transaction, message)
+            )
+            if self.blockchain.has_transaction(transaction.id):
+                print("\n -- Ignored a transaction that is already in the chain")
+            elif self.transaction_pool.set_transaction(transaction):
+                print("\n -- Set the new transaction in the trasaction pool")
+            else:
+                print("\n -- Ignored a transaction, the transaction pool is full")
+
+    def add_block(self, block):
+        potential_chain = self.blockchain.chain[:]
+        potential_chain.append(block)
+
+        try:
+            self.blockchain.replace_chain(potential_chain)
+            self.transaction_pool.clear_blockchain_transactions(self.blockchain)
+            print("\n -- Successfully replace the local chain")
+        except Exception as e:
+            print(f"\n -- Did not replace the chain: {e}")
+
+    def relayed_block(self, message):
+        """the block a request is about, when this node is the one that relayed it"""
+        if self.pubsub is None or message["origin"] != self.pubsub.id:
+            return None
+        return self.pubsub.relayed_blocks.get(message["block_hash"])
+
+    def receive_compact_block(self, message):
+        block_hash = message["header"]["hash"]
+        if (
+            block_hash == self.blockchain.chain[-1].hash
+            or block_hash in self.pending_blocks
+        ):
+            return
+
+        transactions = {
+            transaction_json["id"]: transaction_json
+            for transaction_json in message["prefilled"]
+        }
+        pool = self.transaction_pool.transaction_map
+        missing = []
+        for transaction_id in message["transaction_ids"]:
+            if transaction_id in transactions:
+                continue
+            if transaction_id in pool:
+                transactions[transaction_id] = pool[transaction_id].serialize()
+            else:
+                missing.append(transaction_id)
+
+        if not missing:
+            self.rebuild_compact_block(message, transactions)
+            return
+
+        self.pending_blocks.add(message, transactions)
+        print(f"\n -- Requesting {len(missing)} transactions of block {block_hash}")
+        self.pubsub.publish(
+            CHANNELS["GET_TRANSACTIONS"],
+            {
+                "origin": message["origin"],
+                "block_hash": block_hash,
+                "transaction_ids": missing,
+            },
         )
-        if message_object.channel == CHANNELS["BLOCK"]:
-            block = Block.from_json(message_object.message)
-            potential_chain = self.blockchain.chain[:]
-            potential_chain.append(block)
 
-            try:
-                self.blockchain.replace_chain(potential_chain)
-                self.transaction_pool.clear_blockchain_transactions(self.blockchain)
-                print("\n -- Successfully replace the local chain")
-            except Exception as e:
-                print(f"\n -- Did not replace the chain: {e}")
+    def rebuild_compact_block(self, message, transactions):
+        block = rebuild_block(message, transactions)
+        if block.reconstructed_hash() == block.hash:
+            self.add_block(block)
+            return
 
-        elif message_object.channel == CHANNELS["TRANSACTION"]:
-            transaction = Transaction.from_json(message_object.message)
-            self.transaction_pool.set_transaction(transaction)
-            print("\n -- Set the new transaction in the trasaction pool")
+        print(f"\n -- Could not rebuild block {block.hash}, requesting the full block")
+        self.pubsub.publish(
+            CHANNELS["GET_BLOCK"],
+            {"origin": message["origin"], "block_hash": block.hash},
+        )
 
 
 class PubSub:
     """
     Handles the publish/subscribe layer of the application.
     provides communitcation between the nodes of the blockchain network
+    over a pluggable transport, PubNub unless another one is given.
+
+    With async_publish messages are handed to a publish queue and sent in the
+    background, transactions broadcast in a burst are batched together.
+
+    With the compact block relay, blocks of transactions are broadcast as their header
+    and transaction ids. Relayed blocks are kept to answer the requests of the nodes
+    that cannot rebuild them.
+
+    Only the given channels are subscribed to, all of them by default
     """
 
-    def __init__(self, blockchain, transaction_pool) -> None:
-        self.pubnub = PubNub(pnconfig)
-        self.pubnub.subscribe().channels(CHANNELS.values()).execute()
-        self.pubnub.add_listener(Listner(blockchain, transaction_pool))
+    def __init__(
+        self,
+        blockchain,
+        transaction_pool,
+        wire_format=PUBSUB_WIRE_FORMAT,
+        transport=None,
+        async_publish=PUBSUB_ASYNC_PUBLISH,
+        block_relay=BLOCK_RELAY,
+        channels=None,
+    ) -> None:
+        self.id = uuid.uuid4().hex
+        self.wire_format = wire_format
+        self.block_relay = block_relay
+        self.relayed_blocks = LRUCache(COMPACT_BLOCK_CACHE_SIZE)
+        self.transport = transport or PubNubTransport()
+        self.publish_queue = PublishQueue(self.transport) if async_publish else None
+        self.listner = Listner(blockchain, transaction_pool, self)
+        channels = CHANNELS.values() if channels is None else channels
+        if channels:
+            self.transport.subscribe(channels, self.listner.message)
 
-    def publish(self, channel, message):
+    def publish(self, channel, message, batchable=False):
         """
         publishing the message object to the channel
         """
 
-        self.pubnub.publish().channel(channel).message(message).sync()
+        if self.publish_queue:
+            self.publish_queue.put(channel, message, batchable)
+        else:
+            with PUBLISH_LATENCY.labels(channel).time():
+                self.transport.publish(channel, message)
+
+    def flush(self):
+        """wait until the queued messages are published"""
+        if self.publish_queue:
+            self.publish_queue.flush()
 
     def broadcast_block(self, block):
         """
         Broadcast a block object to all nodes
         """
-        self.publish(CHANNELS["BLOCK"], block.serialize())
+        if self.block_relay == "compact" and is_compactable(block):
+            self.relayed_blocks.put(block.hash, block)
+            self.publish(CHANNELS["COMPACT_BLOCK"], compact_block(block, self.id))
+        else:
+            self.broadcast_full_block(block)
+
+    def broadcast_full_block(self, block):
+        """Broadcast the block with all of its transactions"""
+        self.publish(
+            CHANNELS["BLOCK"],
+            pack_message(encode_block, block.serialize(), self.wire_format),
+        )
 
     def broadcast_transactions(self, transaction):
         """Broadcast a transaction to all nodes"""
-        self.publish(CHANNELS["TRANSACTION"], transaction.serialize())
+        self.publish(
+            CHANNELS["TRANSACTION"],
+            pack_message(encode_transaction, transaction.serialize(), self.wire_format),
+            batchable=True,
+        )
 
 
 def main():
-    pubsub = PubSub()
+    from backend.blockchain.blockchain import Blockchain
+    from backend.wallet.transaction_pool import TransactionPool
+
+    pubsub = PubSub(Blockchain(), TransactionPool(), transport=transport_from_env())
     time.sleep(1)
     pubsub.publish(CHANNELS["TEST"], {"foo": "bar"})
+    pubsub.flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,267 @@
+import json
+import abc
+import socket
+import socketserver
+import threading
+
+PUBNUB_SUBSCRIBE_KEY = "sub-c-0b640abe-eb80-4ef4-b9db-6d2536504fee"
+PUBNUB_PUBLISH_KEY = "pub-c-65116574-c305-45fc-a0f1-5e31234b048e"
+
+BROKER_HOST = "127.0.0.1"
+BROKER_PORT = 4999
+
+
+def deliver(callback, channel, message):
+    """
+    Call the subscriber with the message. An error handling one message is logged, so
+    a malformed or invalid message from a peer does not stop the delivery of the next
+    """
+    try:
+        callback(channel, message)
+    except Exception as e:
+        print(f"\n -- Failed to handle a message on {channel}: {e!r}")
+
+
+class Transport(abc.ABC):
+    """
+    Interface of the message transports PubSub runs on.
+    Messages are json objects, subscribers are called with (channel, message)
+    """
+
+    @abc.abstractmethod
+    def subscribe(self, channels, callback):
+        pass
+
+    @abc.abstractmethod
+    def publish(self, channel, message):
+        pass
+
+    def close(self):
+        pass
+
+
+class PubNubTransport(Transport):
+    """Transport through the hosted PubNub service"""
+
+    def __init__(
+        self, subscribe_key=PUBNUB_SUBSCRIBE_KEY, publish_key=PUBNUB_PUBLISH_KEY
+    ) -> None:
+        from pubnub.pubnub import PubNub
+        from pubnub.pnconfiguration import PNConfiguration
+
+        pnconfig = PNConfiguration()
+        pnconfig.subscribe_key = subscribe_key
+        pnconfig.publish_key = publish_key
+        self.pubnub = PubNub(pnconfig)
+
+    def subscribe(self, channels, callback):
+        from pubnub.callbacks import SubscribeCallback
+
+        class Callback(SubscribeCallback):
+            def message(self, pubnub, message_object):
+                callback(message_object.channel, message_object.message)
+
+        self.pubnub.subscribe().channels(list(channels)).execute()
+        self.pubnub.add_listener(Callback())
+
+    def publish(self, channel, message):
+        self.pubnub.publish().channel(channel).message(message).sync()
+
+    def close(self):
+        self.pubnub.stop()
+
+
+class InMemoryBroker:
+    """
+    Delivers messages between the nodes of one process.
+    Every message goes through json, so nodes never share objects, and is delivered to
+    every subscriber of the channel, the publisher included, before publish returns
+    """
+
+    def __init__(self) -> None:
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channels, callback):
+        with self.lock:
+            for channel in channels:
+                self.subscribers.setdefault(channel, []).append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            for callbacks in self.subscribers.values():
+                if callback in callbacks:
+                    callbacks.remove(callback)
+
+    def publish(self, channel, message):
+        payload = json.dumps(message)
+        with self.lock:
+            callbacks = list(self.subscribers.get(channel, ()))
+
+        for callback in callbacks:
+            deliver(callback, channel, json.loads(payload))
+
+
+class InMemoryTransport(Transport):
+    def __init__(self, broker) -> None:
+        self.broker = broker
+        self.callback = None
+
+    def subscribe(self, channels, callback):
+        self.callback = callback
+        self.broker.subscribe(channels, callback)
+
+    def publish(self, channel, message):
+        self.broker.publish(channel, message)
+
+    def close(self):
+        if self.callback:
+            self.broker.unsubscribe(self.callback)
+
+
+class SocketBrokerHandler(socketserver.StreamRequestHandler):
+    """
+    One connected node. Reads newline delimited json frames:
+    {"subscribe": [channels]} or {"channel": channel, "message": message}
+    """
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.send_lock = threading.Lock()
+
+    def handle(self):
+        broker = self.server.broker
+        broker.connect(self)
+        try:
+            for line in self.rfile:
+                try:
+                    frame = json.loads(line)
+                    if "subscribe" in frame:
+                        broker.subscribe(self, frame["subscribe"])
+                        ack = {"subscribed": frame["subscribe"]}
+                        self.send(json.dumps(ack).encode("utf-8") + b"\n")
+                    else:
+                        broker.forward(frame["channel"], line)
+                except (KeyError, TypeError, ValueError) as e:
+                    print(f"\n -- Dropped a malformed frame: {e!r}")
+        except OSError:
+            pass
+        finally:
+            broker.disconnect(self)
+
+    def send(self, line):
+        with self.send_lock:
+            self.wfile.write(line)
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SocketBroker:
+    """
+    Lightweight TCP broker for nodes running in separate processes on one machine.
+    Published frames are forwarded to every connection subscribed to their channel
+    """
+
+    def __init__(self, host=BROKER_HOST, port=BROKER_PORT) -> None:
+        self.connections = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingTCPServer((host, port), SocketBrokerHandler)
+        self.server.broker = self
+        self.address = self.server.server_address
+
+    def connect(self, connection):
+        with self.lock:
+            self.connections[connection] = set()
+
+    def disconnect(self, connection):
+        with self.lock:
+            self.connections.pop(connection, None)
+
+    def subscribe(self, connection, channels):
+        with self.lock:
+            self.connections[connection].update(channels)
+
+    def forward(self, channel, line):
+        with self.lock:
+            subscribers = [
+                connection
+                for connection, channels in self.connections.items()
+                if channel in channels
+            ]
+
+        for connection in subscribers:
+            try:
+                connection.send(line)
+            except OSError:
+                self.disconnect(connection)
+
+    def start(self):
+        """Serve on a background thread"""
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SocketTransport(Transport):
+    """Transport through a SocketBroker"""
+
+    def __init__(self, host=BROKER_HOST, port=BROKER_PORT) -> None:
+        self.socket = socket.create_connection((host, port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile("rwb")
+        self.lock = threading.Lock()
+        self.callback = None
+        self.subscribed = threading.Event()
+
+    def send(self, frame):
+        with self.lock:
+            self.file.write(json.dumps(frame).encode("utf-8") + b"\n")
+            self.file.flush()
+
+    def subscribe(self, channels, callback, timeout=5):
+        """Subscribe and wait until the broker confirms the subscription"""
+        self.callback = callback
+        threading.Thread(target=self.receive, daemon=True).start()
+        self.send({"subscribe": list(channels)})
+        if not self.subscribed.wait(timeout):
+            raise Exception("The broker did not confirm the subscription")
+
+    def receive(self):
+        try:
+            for line in self.file:
+                try:
+                    frame = json.loads(line)
+                    if "subscribed" in frame:
+                        self.subscribed.set()
+                        continue
+                    channel, message = frame["channel"], frame["message"]
+                except (KeyError, TypeError, ValueError) as e:
+                    print(f"\n -- Dropped a malformed frame: {e!r}")
+                    continue
+
+                deliver(self.callback, channel, message)
+        except OSError:
+            pass
+
+    def publish(self, channel, message):
+        self.send({"channel": channel, "message": message})
+
+    def close(self):
+        self.socket.close()
+
+
+def main():
+    broker = SocketBroker()
+    print(f"Socket broker listening on {broker.address[0]}:{broker.address[1]}")
+    broker.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
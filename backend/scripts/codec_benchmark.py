@@ -0,0 +1,49 @@
+import json
+import time
+from backend.blockchain.block import Block
+from backend.blockchain.codec import encode_chain, decode_chain
+from backend.wallet.transaction import Transaction
+from backend.wallet.wallet import Wallet
+from backend.config import SECONDS
+
+BLOCKS = 50
+TRANSACTIONS_PER_BLOCK = 20
+ROUNDS = 5
+
+wallets = [Wallet() for i in range(10)]
+chain = [Block.genesis()]
+for i in range(BLOCKS):
+    data = [
+        Transaction(wallets[j % len(wallets)], wallets[0].address, 1).serialize()
+        for j in range(TRANSACTIONS_PER_BLOCK)
+    ]
+    data.append(Transaction.reward_transaction(wallets[0]).serialize())
+    chain.append(Block(time.time_ns(), chain[-1].hash, f"{i:064x}", data, 3, i))
+
+chain_json = json.loads(json.dumps([block.serialize() for block in chain]))
+transactions = BLOCKS * (TRANSACTIONS_PER_BLOCK + 1)
+
+
+def timed(function, argument):
+    start_time = time.time_ns()
+    for i in range(ROUNDS):
+        result = function(argument)
+    return result, (time.time_ns() - start_time) / SECONDS / ROUNDS
+
+
+json_payload, json_encode_time = timed(
+    lambda chain_json: json.dumps(chain_json).encode("utf-8"), chain_json
+)
+_, json_decode_time = timed(json.loads, json_payload)
+binary_payload, binary_encode_time = timed(encode_chain, chain_json)
+_, binary_decode_time = timed(decode_chain, binary_payload)
+
+print(f"transactions: {transactions}")
+print(f"json size: {len(json_payload)} bytes ({len(json_payload) / transactions:.0f}/tx)")
+print(
+    f"binary size: {len(binary_payload)} bytes ({len(binary_payload) / transactions:.0f}/tx)"
+)
+print(f"json encode: {json_encode_time * 1000:.2f}ms decode: {json_decode_time * 1000:.2f}ms")
+print(
+    f"binary encode: {binary_encode_time * 1000:.2f}ms decode: {binary_decode_time * 1000:.2f}ms"
+)
@@ -0,0 +1,65 @@
+import io
+import sys
+import time
+import threading
+import contextlib
+from backend.blockchain.blockchain import Blockchain
+from backend.pubsub.pubsub import PubSub, Listner
+from backend.pubsub.transport import (
+    InMemoryBroker,
+    InMemoryTransport,
+    SocketBroker,
+    SocketTransport,
+)
+from backend.wallet.transaction import Transaction
+from backend.wallet.transaction_pool import TransactionPool
+from backend.wallet.wallet import Wallet
+from backend.config import SECONDS
+
+NODES = 4
+MESSAGES = 200
+TRANSPORT = sys.argv[1] if len(sys.argv) > 1 else "memory"
+
+if TRANSPORT == "socket":
+    broker = SocketBroker(port=0).start()
+    make_transport = lambda: SocketTransport(*broker.address)
+else:
+    broker = InMemoryBroker()
+    make_transport = lambda: InMemoryTransport(broker)
+
+deliveries = {}
+delivered = threading.Condition()
+listner_handle = Listner.handle
+
+
+def recording_handle(self, channel, message):
+    listner_handle(self, channel, message)
+    with delivered:
+        deliveries[message["id"]] = deliveries.get(message["id"], 0) + 1
+        delivered.notify_all()
+
+
+Listner.handle = recording_handle
+
+nodes = [
+    PubSub(Blockchain(), TransactionPool(), transport=make_transport())
+    for i in range(NODES)
+]
+transactions = [Transaction(Wallet(), "recipient", 1) for i in range(MESSAGES)]
+
+latencies = []
+with contextlib.redirect_stdout(io.StringIO()):
+    start_time = time.time_ns()
+    for i, transaction in enumerate(transactions):
+        published_at = time.time_ns()
+        nodes[i % NODES].broadcast_transactions(transaction)
+        with delivered:
+            delivered.wait_for(lambda: deliveries.get(transaction.id) == NODES, 5)
+        latencies.append((time.time_ns() - published_at) / SECONDS)
+    total_time = (time.time_ns() - start_time) / SECONDS
+
+latencies.sort()
+print(f"transport: {TRANSPORT}, nodes: {NODES}, messages: {MESSAGES}")
+print(f"throughput: {MESSAGES / total_time:.0f} messages/s")
+print(f"latency p50: {latencies[len(latencies) // 2] * 1000:.3f}ms")
+print(f"latency p99: {latencies[int(len(latencies) * 0.99)] * 1000:.3f}ms")
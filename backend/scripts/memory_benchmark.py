@@ -0,0 +1,38 @@
+import json
+import tracemalloc
+from backend.blockchain.block import Block
+from backend.wallet.transaction import Transaction
+from backend.wallet.wallet import Wallet
+
+BLOCKS = 200
+TRANSACTIONS_PER_BLOCK = 25
+
+wallets = [Wallet() for i in range(10)]
+chain = [Block.genesis()]
+for i in range(BLOCKS):
+    data = [
+        Transaction(wallets[j % len(wallets)], wallets[0].address, 1).serialize()
+        for j in range(TRANSACTIONS_PER_BLOCK)
+    ]
+    chain.append(Block(i, chain[-1].hash, f"{i:064x}", data, 3, i))
+
+payload = json.dumps([block.serialize() for block in chain])
+transactions = BLOCKS * TRANSACTIONS_PER_BLOCK
+
+
+def bytes_per_transaction(load):
+    tracemalloc.start()
+    loaded = load(payload)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return size / transactions
+
+
+def load_blocks(payload):
+    return [Block.from_json(block_json) for block_json in json.loads(payload)]
+
+
+print(f"transactions: {transactions}")
+print(f"json dicts: {bytes_per_transaction(json.loads):.0f} bytes/tx")
+print(f"compact blocks: {bytes_per_transaction(load_blocks):.0f} bytes/tx")
@@ -0,0 +1,42 @@
+import time
+from backend.util.crypto_hash import crypto_hash
+from backend.util.hex_to_binary import hex_to_binry
+from backend.util.proof_of_work import (
+    defficulty_target,
+    digest_meets_target,
+    meets_defficulty,
+)
+from backend.config import SECONDS
+
+CANDIDATES = 100000
+DEFFICULTY = 12
+
+hashes = [crypto_hash(i) for i in range(CANDIDATES)]
+digests = [bytes.fromhex(hash) for hash in hashes]
+
+
+def checks_per_second(check, candidates):
+    start_time = time.time_ns()
+    for candidate in candidates:
+        check(candidate)
+    end_time = time.time_ns()
+
+    return len(candidates) / ((end_time - start_time) / SECONDS)
+
+
+target = defficulty_target(DEFFICULTY)
+
+results = {
+    "hex_to_binry": checks_per_second(
+        lambda hash: hex_to_binry(hash)[0:DEFFICULTY] == "0" * DEFFICULTY, hashes
+    ),
+    "meets_defficulty": checks_per_second(
+        lambda hash: meets_defficulty(hash, DEFFICULTY), hashes
+    ),
+    "digest_meets_target": checks_per_second(
+        lambda digest: digest_meets_target(digest, target), digests
+    ),
+}
+
+for name, rate in results.items():
+    print(f"{name}: {rate:,.0f} checks/s")
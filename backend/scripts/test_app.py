@@ -10,7 +10,10 @@ def get_blockchain():
 
 
 def get_blockchain_mine():
-    return requests.get(f"{BASE_URL}/blockchain/mine").json()
+    job = requests.get(f"{BASE_URL}/blockchain/mine").json()
+    while job["status"] in ("queued", "mining"):
+        job = requests.get(f"{BASE_URL}/blockchain/mine/{job['id']}?wait=10").json()
+    return job["block"]
 
 
 def post_wallet_transact(recipient, amount):
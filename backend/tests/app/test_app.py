@@ -0,0 +1,139 @@
+import sys
+import json
+import time
+import importlib
+import pytest
+from flask import Flask
+from backend.blockchain import light_blockchain
+from backend.pubsub.transport import SocketBroker
+from backend.util.metrics import REGISTRY
+from backend.config import STARTING_BALANCE
+
+APP_GAUGES = [
+    "transaction_pool_transactions",
+    "transaction_pool_bytes",
+    "blockchain_height",
+]
+
+
+def import_app(monkeypatch, **env):
+    """a fresh import of the app module with the environment, without serving"""
+    for name in ["LIGHT", "PEER", "SEED_DATA", "BLOCK_STORE_PATH"]:
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(Flask, "run", lambda self, **kwargs: None)
+    monkeypatch.delitem(sys.modules, "backend.app", raising=False)
+
+    app_module = importlib.import_module("backend.app")
+    for name in APP_GAUGES:
+        REGISTRY.unregister(name)
+    return app_module
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """a local socket broker the imported nodes publish through"""
+    broker = SocketBroker(port=0).start()
+    host, port = broker.address
+    monkeypatch.setenv("PUBSUB_BROKER", f"{host}:{port}")
+    nodes = []
+    yield nodes
+
+    for node in nodes:
+        node.pubsub.transport.close()
+    broker.close()
+
+
+@pytest.fixture
+def node(monkeypatch, broker):
+    broker.append(import_app(monkeypatch))
+    return broker[-1]
+
+
+@pytest.fixture
+def light_node(monkeypatch, broker, node):
+    """a light node of the full node, on the default block versions"""
+    full_client = node.app.test_client()
+
+    def fetch(path, params):
+        response = full_client.get(path, query_string=params)
+        assert response.status_code == 200
+        return json.loads(response.data)
+
+    monkeypatch.setattr(light_blockchain, "http_fetcher", lambda url: fetch)
+    broker.append(import_app(monkeypatch, LIGHT="True"))
+    return broker[-1]
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_blockchain_length_not_modified(node):
+    client = node.app.test_client()
+    response = client.get("/blockchain/length")
+    etag = response.headers["ETag"]
+
+    not_modified = client.get("/blockchain/length", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json == 1
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+    assert not_modified.headers["ETag"] == etag
+
+
+def test_blockchain_range_etag_changes_after_new_block(node):
+    client = node.app.test_client()
+    etag = client.get("/blockchain/range?start=0&end=1").headers["ETag"]
+
+    node.blockchain.add_block([])
+    response = client.get(
+        "/blockchain/range?start=0&end=2", headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json) == 2
+
+
+@pytest.mark.parametrize("wait", ["soon", "nan", "-1", "inf"])
+def test_mining_job_rejects_bad_wait(node, wait):
+    client = node.app.test_client()
+    job = client.get("/blockchain/mine").json
+
+    response = client.get(f"/blockchain/mine/{job['id']}?wait={wait}")
+
+    assert response.status_code == 400
+    assert "error" in response.json
+
+
+def test_light_node_transacts_again_after_mining(node, light_node):
+    client = light_node.app.test_client()
+    full_client = node.app.test_client()
+
+    def transact_and_mine(recipient, amount):
+        transaction = client.post(
+            "/wallet/transact", json={"recipient": recipient, "amount": amount}
+        ).json
+        assert wait_for(
+            lambda: transaction["id"] in node.transaction_pool.transaction_map
+        )
+        job = full_client.get("/blockchain/mine").json
+        job = full_client.get(f"/blockchain/mine/{job['id']}?wait=30").json
+        assert job["status"] == "done"
+        return transaction
+
+    first = transact_and_mine("recipient_1", 10)
+    second = transact_and_mine("recipient_2", 5)
+
+    assert second["id"] != first["id"]
+    assert list(light_node.transaction_pool.transaction_map) == [second["id"]]
+    assert client.get("/wallet/info").json["balance"] == STARTING_BALANCE - 15
+    assert node.blockchain.balance("recipient_2") == STARTING_BALANCE + 5
@@ -0,0 +1,85 @@
+import json
+import pytest
+from backend.benchmarks import suite
+from backend.blockchain.blockchain import Blockchain
+from backend.benchmarks.runner import (
+    Benchmark,
+    percentile,
+    run_benchmark,
+    compare,
+    save_results,
+    load_results,
+)
+
+
+def test_percentile():
+    samples = [4, 1, 3, 2, 5]
+
+    assert percentile(samples, 0) == 1
+    assert percentile(samples, 50) == 3
+    assert percentile(samples, 100) == 5
+    assert percentile(samples, 90) == pytest.approx(4.6)
+    assert percentile([7], 99) == 7
+
+
+def test_run_benchmark_warmup_and_setup():
+    calls = []
+    setups = []
+    benchmark = Benchmark(
+        "test", calls.append, setup=lambda: setups.append(1) or len(setups), number=3
+    )
+
+    result = run_benchmark(benchmark, warmup=2, repeat=4)
+
+    assert result["runs"] == 4
+    assert len(setups) == 6
+    assert calls == [i for i in range(1, 7) for _ in range(3)]
+    assert result["min"] <= result["p50"] <= result["p90"] <= result["max"]
+
+
+def test_compare_flags_regressions():
+    baseline = {"fast": {"p50": 1.0}, "slow": {"p50": 1.0}, "zero": {"p50": 0}}
+    results = {
+        "fast": {"p50": 1.1},
+        "slow": {"p50": 1.5},
+        "zero": {"p50": 1.0},
+        "new": {"p50": 9.0},
+    }
+
+    regressions = compare(results, baseline, threshold=0.2)
+
+    assert [regression["name"] for regression in regressions] == ["slow"]
+    assert regressions[0]["ratio"] == pytest.approx(1.5)
+
+
+def test_save_and_load_results(tmp_path):
+    path = tmp_path / "results.json"
+    results = {"test": {"p50": 0.5}}
+
+    save_results(path, results, {"blocks": 1})
+
+    assert load_results(path) == results
+    assert json.loads(path.read_text())["parameters"] == {"blocks": 1}
+
+
+def test_suite_main(tmp_path):
+    output = tmp_path / "results.json"
+    baseline = tmp_path / "baseline.json"
+    arguments = ["--blocks", "2", "--transactions", "2", "--defficulty", "1"]
+    arguments += ["--warmup", "0", "--repeat", "2", "--filter", "chain_round_trip"]
+
+    assert suite.main(arguments + ["--output", str(output)]) == 0
+    assert set(load_results(output)) == {
+        "json.chain_round_trip",
+        "codec.chain_round_trip",
+    }
+
+    save_results(baseline, {"json.chain_round_trip": {"p50": 1e-12}}, {"blocks": 2})
+    assert suite.main(arguments + ["--baseline", str(baseline)]) == 1
+
+
+def test_synthetic_chain_is_valid():
+    blockchain = suite.build_blockchain(3, 2, ["recipient"])
+
+    assert len(blockchain.chain) == 4
+    Blockchain.is_valid_chain(blockchain.chain)
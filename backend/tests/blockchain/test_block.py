@@ -1,6 +1,6 @@
 from backend.blockchain.block import Block, GENESIS_DATA
 import time
-from backend.config import MINE_RATE, SECONDS
+from backend.config import MINE_RATE, SECONDS, BLOCK_VERSION_HEIGHTS
 from backend.util.hex_to_binary import hex_to_binry
 import pytest
 
@@ -57,6 +57,12 @@ def block(last_block):
     return Block.mine_block(last_block, "test-data")
 
 
+@pytest.fixture
+def version_1(monkeypatch):
+    """activate block version 1 from height 2"""
+    monkeypatch.setitem(BLOCK_VERSION_HEIGHTS, 1, 2)
+
+
 def test_is_valid_block(last_block, block):
     Block.is_valid_block(last_block, block)
 
@@ -85,3 +91,74 @@ def test_is_valid_block_bad_block_hash(last_block, block):
     block.hash = "000000000000bbab1111abc"
     with pytest.raises(Exception, match="Block hash must be correct"):
         Block.is_valid_block(last_block, block)
+
+
+def test_mine_block_parallel():
+    last_block = Block.genesis()
+    data = "test-data"
+
+    block = Block.mine_block(last_block, data, workers=2)
+
+    assert isinstance(block, Block)
+    assert block.data == data
+    assert block.last_hash == last_block.hash
+    Block.is_valid_block(last_block, block)
+
+
+def test_mine_block_merkle_root(last_block, version_1):
+    data = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    block = Block.mine_block(last_block, data, height=2)
+
+    assert block.version == 1
+    assert block.merkle_root == Block.data_root(data)
+    assert Block.header_hash(block.header()) == block.hash
+    Block.is_valid_block(last_block, block)
+
+
+def test_mine_block_legacy_version(last_block, version_1):
+    block = Block.mine_block(last_block, "test-data", height=1)
+
+    assert block.version == 0
+    assert "merkle_root" not in block.serialize()
+    assert Block.header_hash(block.header()) is None
+    Block.is_valid_block(last_block, block, 1)
+
+
+def test_version_1_not_scheduled():
+    assert Block.version_at(10**9) == 0
+    assert Block.mine_block(Block.genesis(), "test-data", height=1).version == 0
+
+
+def test_is_valid_block_bad_merkle_root(last_block, version_1):
+    block = Block.mine_block(last_block, "test-data", height=2)
+    block.merkle_root = Block.data_root("evil_data")
+    with pytest.raises(Exception, match="The block merkle root must match its data"):
+        Block.is_valid_block(last_block, block, 2)
+
+
+def test_is_valid_block_version_at_height(last_block, version_1):
+    block = Block.mine_block(last_block, "test-data", height=1)
+    next_block = Block.mine_block(block, "test-data", height=2)
+
+    with pytest.raises(Exception, match="version 1 is not valid at height 1"):
+        Block.is_valid_block(block, next_block, 1)
+    with pytest.raises(Exception, match="version 0 is not valid at height 2"):
+        Block.is_valid_block(last_block, block, 2)
+
+
+def test_is_valid_block_version_goes_back(version_1):
+    block = Block.mine_block(Block.genesis(), "test-data", height=2)
+    next_block = Block.mine_block(block, "test-data")
+    next_block.version = 0
+    with pytest.raises(Exception, match="The block version 0 is not valid"):
+        Block.is_valid_block(block, next_block)
+
+
+def test_transaction_proof(last_block, version_1):
+    data = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    block = Block.mine_block(last_block, data, height=2)
+    proof = block.transaction_proof("b")
+
+    assert Block.verify_transaction_proof(block.header(), data[1], proof)
+    assert not Block.verify_transaction_proof(block.header(), {"id": "d"}, proof)
+    assert block.transaction_proof("d") is None
@@ -0,0 +1,82 @@
+import os
+import json
+import pytest
+from backend.blockchain.block import Block
+from backend.blockchain.block_store import BlockStore
+from backend.blockchain.blockchain import Blockchain
+from backend.wallet.transaction import Transaction
+from backend.wallet.wallet import Wallet
+
+
+def as_json(chain):
+    return json.loads(json.dumps([block.serialize() for block in chain]))
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "store")
+
+
+def test_blockchain_reopens_from_store(store_path):
+    blockchain = Blockchain(BlockStore(store_path))
+    for i in range(3):
+        blockchain.add_block([Transaction(Wallet(), "recipt", i).serialize()])
+    blockchain.store.close()
+
+    reopened = Blockchain(BlockStore(store_path))
+
+    assert as_json(reopened.chain) == as_json(blockchain.chain)
+    assert reopened.checkpoint.height == len(blockchain.chain)
+
+
+def test_store_replaces_forked_blocks(store_path):
+    blockchain = Blockchain(BlockStore(store_path))
+    blockchain.add_block([Transaction(Wallet(), "recipt", 1).serialize()])
+
+    longer = Blockchain()
+    for i in range(2):
+        longer.add_block([Transaction(Wallet(), "recipt", i).serialize()])
+    blockchain.replace_chain(longer.chain)
+    blockchain.store.close()
+
+    store = BlockStore(store_path)
+    assert as_json(store.read_chain()) == as_json(longer.chain)
+
+
+def test_store_recovers_from_partial_write(store_path):
+    store = BlockStore(store_path)
+    blockchain = Blockchain(store)
+    blockchain.add_block("one")
+    blockchain.add_block("two")
+    store.close()
+
+    log_path = os.path.join(store_path, "blocks.log")
+    os.truncate(log_path, os.path.getsize(log_path) - 5)
+
+    store = BlockStore(store_path)
+    assert len(store) == 2
+    assert store.read_chain() == blockchain.chain[:2]
+
+    store.append(blockchain.chain[2])
+    assert store.read(2) == blockchain.chain[2]
+
+
+def test_store_binary_format(store_path):
+    blockchain = Blockchain(BlockStore(store_path, wire_format="binary"))
+    blockchain.add_block([Transaction(Wallet(), "recipt", 1).serialize()])
+    blockchain.store.close()
+
+    store = BlockStore(store_path)
+    assert as_json(store.read_chain()) == as_json(blockchain.chain)
+
+
+@pytest.mark.parametrize("hash", ["a" * 65, "hash\0"])
+def test_store_refuses_hash_not_fitting_index(store_path, hash):
+    store = BlockStore(store_path)
+    store.write_chain([Block.genesis()])
+    block = Block.mine_block(Block.genesis(), "test-data")
+    block.hash = hash
+
+    with pytest.raises(Exception, match="does not fit the index"):
+        store.append(block)
+    assert len(store) == 1
@@ -1,8 +1,11 @@
+import json
 from backend.blockchain.blockchain import Blockchain
-from backend.blockchain.block import GENESIS_DATA
+from backend.blockchain.block import Block, GENESIS_DATA
 import pytest
 from backend.wallet.transaction import Transaction
+from backend.wallet.ledger import Ledger
 from backend.wallet.wallet import Wallet
+from backend.config import BLOCK_VERSION_HEIGHTS
 
 
 def test_blockchain_instance():
@@ -37,6 +40,12 @@ def test_is_valid_chain_bad_genesis(blockchain):
         Blockchain.is_valid_chain(blockchain.chain)
 
 
+def test_is_valid_chain_bad_genesis_empty_ledger(blockchain):
+    blockchain.chain[0].hash = "eveil_hash"
+    with pytest.raises(Exception, match="The genesis block must be valid"):
+        Blockchain.is_valid_chain(blockchain.chain, Ledger())
+
+
 def test_replace_chain(blockchain):
     blockchain_n = Blockchain()
     blockchain_n.replace_chain(blockchain.chain)
@@ -103,3 +112,126 @@ def test_is_valid_trasnaction_chain_bad_historic_balance(blockchain):
 
     with pytest.raises(Exception, match="has invalid input amount"):
         Blockchain.is_valid_transaction_chain(blockchain.chain)
+
+
+def test_is_valid_transaction_chain_malformed_key_errors_in_order(blockchain):
+    wallet = Wallet()
+    bad_transaction = Transaction(wallet, "recip", 1)
+    bad_transaction.input["ammount"] = 9001
+    bad_transaction.input["public_key"] = "not a public key"
+    blockchain.add_block([bad_transaction.serialize()])
+
+    with pytest.raises(Exception, match="has invalid input amount"):
+        Blockchain.is_valid_transaction_chain(blockchain.chain)
+
+
+def test_is_valid_transaction_chain_verifies_signatures_in_batches(monkeypatch):
+    monkeypatch.setattr("backend.blockchain.blockchain.VERIFY_BATCH_SIZE", 2)
+    batches = []
+    verify_signatures = Transaction.verify_signatures
+    monkeypatch.setattr(
+        Transaction,
+        "verify_signatures",
+        lambda transaction_jsons: batches.append(len(transaction_jsons))
+        or verify_signatures(transaction_jsons),
+    )
+    blockchain = Blockchain()
+    transaction = Transaction(Wallet(), "recipt", 1).serialize()
+    blockchain.add_block([transaction, transaction])
+    for i in range(3):
+        blockchain.add_block([Transaction(Wallet(), "recipt", i + 1).serialize()])
+
+    with pytest.raises(Exception, match="is not unique"):
+        Blockchain.is_valid_transaction_chain(blockchain.chain)
+    assert batches == [2]
+
+    batches.clear()
+    Blockchain.is_valid_transaction_chain(blockchain.chain[:1] + blockchain.chain[2:])
+    assert batches == [2, 1]
+
+
+def test_is_valid_transaction_chain_spend_after_receive(blockchain):
+    wallet = Wallet(blockchain)
+    blockchain.add_block([Transaction(Wallet(), wallet.address, 40).serialize()])
+    blockchain.add_block([Transaction(wallet, "recipt", 1000).serialize()])
+
+    ledger = Blockchain.is_valid_transaction_chain(blockchain.chain)
+
+    assert ledger.balance(wallet.address) == 40
+
+
+def test_replace_chain_validates_suffix_after_checkpoint(blockchain, monkeypatch):
+    blockchain_n = Blockchain()
+    blockchain_n.replace_chain(blockchain.chain[:])
+    blockchain.add_block([Transaction(Wallet(), "recipt", 5).serialize()])
+
+    validated_blocks = []
+    is_valid_block = Block.is_valid_block
+    monkeypatch.setattr(
+        Block,
+        "is_valid_block",
+        lambda last_block, block, height=None: validated_blocks.append(block)
+        or is_valid_block(last_block, block, height),
+    )
+    blockchain_n.replace_chain(blockchain.chain[:])
+
+    assert validated_blocks == [blockchain.chain[-1]]
+    assert blockchain_n.chain == blockchain.chain
+    assert blockchain_n.checkpoint.height == len(blockchain.chain)
+
+
+def test_replace_chain_fork_revalidates_from_genesis(blockchain):
+    blockchain_n = Blockchain()
+    blockchain_n.add_block([Transaction(Wallet(), "recipt", 5).serialize()])
+    blockchain_n.replace_chain(blockchain.chain)
+
+    assert blockchain_n.chain == blockchain.chain
+
+
+def test_replace_chain_suffix_duplicate_transaction(blockchain):
+    blockchain_n = Blockchain()
+    blockchain_n.replace_chain(blockchain.chain[:])
+    blockchain.add_block([blockchain.chain[1].data[0]])
+
+    with pytest.raises(Exception, match="is not unique"):
+        blockchain_n.replace_chain(blockchain.chain)
+
+
+def test_block_version_activation(monkeypatch):
+    monkeypatch.setitem(BLOCK_VERSION_HEIGHTS, 1, 2)
+    blockchain = Blockchain()
+    for i in range(3):
+        blockchain.add_block([Transaction(Wallet(), "recipt", i + 1).serialize()])
+
+    assert [block.version for block in blockchain.chain] == [0, 0, 1, 1]
+    Blockchain.is_valid_chain(blockchain.chain)
+
+    monkeypatch.setitem(BLOCK_VERSION_HEIGHTS, 1, 3)
+    with pytest.raises(Exception, match="version 1 is not valid at height 2"):
+        Blockchain.is_valid_chain(blockchain.chain)
+
+    monkeypatch.setitem(BLOCK_VERSION_HEIGHTS, 1, None)
+    with pytest.raises(Exception, match="version 1 is not valid at height 2"):
+        Blockchain.is_valid_chain(blockchain.chain)
+
+
+def test_serialize_range(blockchain):
+    for start, end in [(0, 2), (1, 3), (2, 10), (-2, -1), (5, 6)]:
+        assert (
+            blockchain.serialize_range(start, end)
+            == blockchain.serialize()[::-1][start:end]
+        )
+
+
+def test_etag_changes_with_chain(blockchain):
+    etag = blockchain.etag()
+    blockchain.add_block("test_data")
+
+    assert blockchain.etag() != etag
+
+
+def test_iter_json(blockchain):
+    chain_json = json.loads("".join(blockchain.iter_json(chunk_size=2)))
+
+    assert json.dumps(chain_json) == json.dumps(blockchain.serialize())
+    assert blockchain.json_cache.info()["size"] == len(blockchain.chain)
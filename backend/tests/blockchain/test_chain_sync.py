@@ -0,0 +1,140 @@
+import copy
+import pytest
+from backend.blockchain.blockchain import Blockchain
+from backend.blockchain.chain_sync import ChainSync, encode_locator, decode_locator
+from backend.wallet.transaction import Transaction
+from backend.wallet.wallet import Wallet
+from backend.config import BLOCK_VERSION_HEIGHTS
+
+
+def add_blocks(blockchain, count):
+    for i in range(count):
+        blockchain.add_block([Transaction(Wallet(), "recipt", i + 1).serialize()])
+
+
+class Peer:
+    """serves the sync endpoints of the app from a blockchain"""
+
+    def __init__(self, blockchain, headers_limit=2000) -> None:
+        self.blockchain = blockchain
+        self.headers_limit = headers_limit
+        self.requests = []
+
+    def fetch(self, path, params):
+        self.requests.append((path, params))
+        if path == "/blockchain/headers":
+            if "locator" in params:
+                start = self.blockchain.fork_height(decode_locator(params["locator"]))
+            else:
+                start = params["start"]
+            return {
+                "start": start,
+                "height": len(self.blockchain.chain),
+                "headers": self.blockchain.headers(start, self.headers_limit),
+            }
+
+        return [
+            block.serialize()
+            for block in self.blockchain.chain[params["start"] : params["end"]]
+        ]
+
+
+@pytest.fixture
+def remote():
+    blockchain = Blockchain()
+    add_blocks(blockchain, 5)
+    return blockchain
+
+
+def test_locator_round_trip(remote):
+    locator = remote.locator()
+
+    assert locator[0] == (5, remote.chain[5].hash)
+    assert locator[-1] == (0, remote.chain[0].hash)
+    assert decode_locator(encode_locator(locator)) == locator
+
+
+def test_fork_height(remote):
+    local = Blockchain()
+    local.chain = remote.chain[:3]
+    add_blocks(local, 2)
+
+    assert remote.fork_height(local.locator()) == 3
+
+
+def test_sync_from_genesis(remote):
+    local = Blockchain()
+
+    assert ChainSync(local, fetch=Peer(remote).fetch).sync() == 5
+    assert local.chain == remote.chain
+
+
+def test_sync_only_missing_blocks(remote):
+    local = Blockchain()
+    local.replace_chain(remote.chain[:4])
+    add_blocks(remote, 2)
+    peer = Peer(remote)
+
+    assert ChainSync(local, fetch=peer.fetch, batch_size=2).sync() == 4
+    assert local.chain == remote.chain
+    assert [params["start"] for path, params in peer.requests[1:]] == [4, 6]
+
+
+def test_sync_up_to_date(remote):
+    local = Blockchain()
+    local.replace_chain(remote.chain)
+
+    assert ChainSync(local, fetch=Peer(remote).fetch).sync() == 0
+
+
+def test_sync_paged_headers(remote):
+    local = Blockchain()
+
+    assert ChainSync(local, fetch=Peer(remote, headers_limit=2).fetch).sync() == 5
+    assert local.chain == remote.chain
+
+
+def test_sync_fork(remote):
+    local = Blockchain()
+    local.replace_chain(remote.chain[:3])
+    add_blocks(local, 1)
+
+    assert ChainSync(local, fetch=Peer(remote).fetch).sync() == 3
+    assert local.chain == remote.chain
+
+
+def test_sync_bad_header(remote):
+    peer = Peer(remote)
+    fetch = lambda path, params: tamper(path, peer.fetch(path, params))
+
+    def tamper(path, result):
+        if path == "/blockchain/headers":
+            result = copy.deepcopy(result)
+            result["headers"][1]["last_hash"] = "evil_hash"
+        return result
+
+    with pytest.raises(Exception, match="does not link"):
+        ChainSync(Blockchain(), fetch=fetch).sync()
+
+
+def test_sync_header_version_before_activation(monkeypatch):
+    monkeypatch.setitem(BLOCK_VERSION_HEIGHTS, 1, 3)
+    remote = Blockchain()
+    add_blocks(remote, 4)
+
+    monkeypatch.setitem(BLOCK_VERSION_HEIGHTS, 1, 4)
+    with pytest.raises(Exception, match="is not version 0"):
+        ChainSync(Blockchain(), fetch=Peer(remote).fetch).sync()
+
+
+def test_sync_block_does_not_match_header(remote):
+    peer = Peer(remote)
+
+    def fetch(path, params):
+        result = peer.fetch(path, params)
+        if path == "/blockchain/blocks":
+            result[0]["nonce"] += 1
+        return result
+
+    with pytest.raises(Exception, match="does not match its header"):
+        ChainSync(Blockchain(), fetch=fetch).sync()
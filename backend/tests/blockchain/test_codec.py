@@ -0,0 +1,86 @@
+import json
+import pytest
+from backend.blockchain.block import Block
+from backend.blockchain.blockchain import Blockchain
+from backend.blockchain.codec import (
+    encode_block,
+    decode_block,
+    encode_transaction,
+    decode_transaction,
+    encode_chain,
+    decode_chain,
+)
+from backend.wallet.transaction import Transaction
+from backend.wallet.wallet import Wallet
+from backend.config import BLOCK_VERSION_HEIGHTS
+
+
+def as_json(value):
+    return json.loads(json.dumps(value))
+
+
+@pytest.fixture
+def blockchain():
+    blockchain = Blockchain()
+    for i in range(2):
+        blockchain.add_block(
+            [
+                Transaction(Wallet(), "recipt", i + 1).serialize(),
+                Transaction.reward_transaction(Wallet()).serialize(),
+            ]
+        )
+    blockchain.add_block("string data")
+    return blockchain
+
+
+def test_transaction_round_trip():
+    transaction_json = Transaction(Wallet(), "recipt", 12).serialize()
+    payload = encode_transaction(transaction_json)
+
+    assert decode_transaction(payload) == as_json(transaction_json)
+    assert len(payload) < len(json.dumps(transaction_json)) / 3
+
+
+def test_transaction_round_trip_keeps_key_order():
+    transaction_json = Transaction(Wallet(), "recipt", 12).serialize()
+    transaction_json["input"] = dict(reversed(transaction_json["input"].items()))
+
+    decoded = decode_transaction(encode_transaction(transaction_json))
+
+    assert json.dumps(decoded) == json.dumps(transaction_json)
+
+
+def test_chain_round_trip(blockchain):
+    chain_json = blockchain.serialize()
+    decoded = decode_chain(encode_chain(chain_json))
+
+    assert json.dumps(decoded) == json.dumps(chain_json)
+    Blockchain.is_valid_chain(Blockchain.from_json(decoded[:-1]).chain)
+
+
+def test_versioned_chain_round_trip(monkeypatch):
+    monkeypatch.setitem(BLOCK_VERSION_HEIGHTS, 1, 2)
+    blockchain = Blockchain()
+    for i in range(3):
+        blockchain.add_block([Transaction(Wallet(), "recipt", i + 1).serialize()])
+    chain_json = blockchain.serialize()
+
+    decoded = decode_chain(encode_chain(chain_json))
+
+    assert [block.get("version", 0) for block in decoded] == [0, 0, 1, 1]
+    assert json.dumps(decoded) == json.dumps(chain_json)
+    Blockchain.is_valid_chain(Blockchain.from_json(decoded).chain)
+
+
+def test_block_round_trip(blockchain):
+    for block in blockchain.chain:
+        assert Block.from_json(decode_block(encode_block(block.serialize()))) == (
+            Block.from_json(as_json(block.serialize()))
+        )
+
+
+def test_decode_unsupported_version(blockchain):
+    payload = encode_block(blockchain.chain[1].serialize())
+
+    with pytest.raises(Exception, match="Unsupported codec version"):
+        decode_block(b"\x7f" + payload[1:])
@@ -0,0 +1,169 @@
+import json
+import pytest
+from backend.blockchain.blockchain import Blockchain
+from backend.blockchain.light_blockchain import LightBlockchain
+from backend.blockchain.chain_sync import decode_locator
+from backend.wallet.transaction import Transaction
+from backend.wallet.wallet import Wallet
+from backend.config import STARTING_BALANCE, BLOCK_VERSION_HEIGHTS
+
+
+class FullNode:
+    """serves the endpoints light nodes use from a blockchain, through json"""
+
+    def __init__(self, blockchain) -> None:
+        self.blockchain = blockchain
+        self.tamper = lambda path, result: result
+
+    def fetch(self, path, params):
+        if path == "/blockchain/headers":
+            if "locator" in params:
+                start = self.blockchain.fork_height(decode_locator(params["locator"]))
+            else:
+                start = params["start"]
+            result = {
+                "start": start,
+                "height": len(self.blockchain.chain),
+                "headers": self.blockchain.headers(start),
+            }
+        elif path == "/blockchain/blocks":
+            result = json.loads(
+                self.blockchain.blocks_json(params["start"], params["end"])
+            )
+        else:
+            result = self.blockchain.address_transactions(params["address"])
+
+        return self.tamper(path, json.loads(json.dumps(result)))
+
+
+def wallet_with_history():
+    blockchain = Blockchain()
+    wallet = Wallet(blockchain)
+    blockchain.add_block([Transaction.reward_transaction(wallet).serialize()])
+    blockchain.add_block(
+        [
+            Transaction(wallet, "recipt", 10).serialize(),
+            Transaction(Wallet(), wallet.address, 25).serialize(),
+        ]
+    )
+    blockchain.add_block([Transaction(Wallet(), "recipt", 5).serialize()])
+    return wallet
+
+
+@pytest.fixture
+def wallet(monkeypatch):
+    """a wallet on a chain of version 1 blocks, the ones with inclusion proofs"""
+    monkeypatch.setitem(BLOCK_VERSION_HEIGHTS, 1, 1)
+    return wallet_with_history()
+
+
+@pytest.fixture
+def full_node(wallet):
+    return FullNode(wallet.blockchain)
+
+
+def test_light_sync_headers(full_node):
+    light = LightBlockchain(fetch=full_node.fetch)
+
+    assert light.sync() == 3
+    assert light.headers == [block.header() for block in full_node.blockchain.chain]
+    assert light.sync() == 0
+
+
+def test_light_balance(wallet, full_node):
+    light = LightBlockchain(fetch=full_node.fetch)
+    light.sync()
+
+    assert Wallet(light).balance == STARTING_BALANCE
+    assert light.balance(wallet.address) == wallet.balance
+    assert light.balance("recipt") == wallet.blockchain.balance("recipt")
+
+
+def test_light_balance_syncs_new_headers(wallet, full_node):
+    light = LightBlockchain(fetch=full_node.fetch)
+    light.sync()
+    wallet.blockchain.add_block([Transaction(Wallet(), wallet.address, 7).serialize()])
+
+    assert light.balance(wallet.address) == wallet.balance
+    assert len(light) == len(wallet.blockchain.chain)
+
+
+def test_light_balance_bad_proof(wallet, full_node):
+    light = LightBlockchain(fetch=full_node.fetch)
+    light.sync()
+
+    def tamper(path, result):
+        if path == "/wallet/transactions":
+            result[-1]["transaction"]["output"][wallet.address] += 100
+        return result
+
+    full_node.tamper = tamper
+    with pytest.raises(Exception, match="is not proven"):
+        light.balance(wallet.address)
+
+
+def test_light_balance_duplicate_transaction(wallet, full_node):
+    light = LightBlockchain(fetch=full_node.fetch)
+    light.sync()
+
+    def tamper(path, result):
+        if path == "/wallet/transactions":
+            result.append(result[-1])
+        return result
+
+    full_node.tamper = tamper
+    with pytest.raises(Exception, match="is not unique"):
+        light.balance(wallet.address)
+
+
+def test_light_sync_bad_header(full_node):
+    def tamper(path, result):
+        result["headers"][1]["nonce"] += 1
+        return result
+
+    full_node.tamper = tamper
+    with pytest.raises(Exception, match="does not match its fields"):
+        LightBlockchain(fetch=full_node.fetch).sync()
+
+
+def test_light_balance_version_0_blocks():
+    wallet = wallet_with_history()
+    full_node = FullNode(wallet.blockchain)
+    light = LightBlockchain(fetch=full_node.fetch)
+    light.sync()
+
+    assert all("version" not in header for header in light.headers)
+    assert light.balance(wallet.address) == wallet.balance
+    assert light.balance("recipt") == wallet.blockchain.balance("recipt")
+
+
+def test_light_balance_version_0_block_not_matching_header():
+    wallet = wallet_with_history()
+    full_node = FullNode(wallet.blockchain)
+    light = LightBlockchain(fetch=full_node.fetch)
+    light.sync()
+
+    def tamper(path, result):
+        if path == "/blockchain/blocks":
+            result[0]["data"][0]["output"][wallet.address] += 100
+        return result
+
+    full_node.tamper = tamper
+    with pytest.raises(Exception, match="does not match its header"):
+        light.balance(wallet.address)
+
+
+def test_light_balance_version_0_transaction_not_in_block():
+    wallet = wallet_with_history()
+    full_node = FullNode(wallet.blockchain)
+    light = LightBlockchain(fetch=full_node.fetch)
+    light.sync()
+
+    def tamper(path, result):
+        if path == "/wallet/transactions":
+            result[-1]["transaction"]["output"][wallet.address] += 100
+        return result
+
+    full_node.tamper = tamper
+    with pytest.raises(Exception, match="is not proven"):
+        light.balance(wallet.address)
@@ -0,0 +1,63 @@
+from backend.blockchain.blockchain import Blockchain
+from backend.blockchain.mining_queue import MiningQueue
+
+
+def test_mining_queue_mines_in_background():
+    blockchain = Blockchain()
+    mined_blocks = []
+    mining_queue = MiningQueue(blockchain, lambda: "test-data", mined_blocks.append)
+
+    job = mining_queue.submit()
+    assert mining_queue.wait(job.id, timeout=30) is job
+
+    assert job.status == "done"
+    assert blockchain.chain[-1] is job.block
+    assert mined_blocks == [job.block]
+    assert job.serialize()["block"]["data"] == "test-data"
+
+
+def test_mining_queue_failed_job():
+    def data_source():
+        raise Exception("no data")
+
+    mining_queue = MiningQueue(Blockchain(), data_source)
+    job = mining_queue.wait(mining_queue.submit().id, timeout=30)
+
+    assert job.status == "failed"
+    assert job.error == "no data"
+
+
+def test_mining_queue_unknown_job():
+    assert MiningQueue(Blockchain(), lambda: []).wait("unknown", timeout=0) is None
+
+
+def test_mining_queue_mines_again_on_a_new_tip():
+    blockchain = Blockchain()
+    calls = []
+
+    def data_source():
+        calls.append(len(blockchain.chain))
+        if len(calls) == 1:
+            blockchain.add_block("other-data")
+        return "test-data"
+
+    mining_queue = MiningQueue(blockchain, data_source)
+    job = mining_queue.wait(mining_queue.submit().id, timeout=30)
+
+    assert job.status == "done"
+    assert calls == [1, 2]
+    assert blockchain.chain[-1] is job.block
+    assert job.block.last_hash == blockchain.chain[1].hash
+
+
+def test_mining_queue_appends_under_the_chain_lock():
+    blockchain = Blockchain()
+    mining_queue = MiningQueue(blockchain, lambda: "test-data")
+
+    with blockchain.lock:
+        job = mining_queue.wait(mining_queue.submit().id, timeout=1)
+        assert job.status == "mining"
+        assert len(blockchain.chain) == 1
+
+    assert mining_queue.wait(job.id, timeout=30).status == "done"
+    assert blockchain.chain[-1] is job.block
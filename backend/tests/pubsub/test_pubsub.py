@@ -0,0 +1,328 @@
+import json
+import time
+import socketserver
+import threading
+import pytest
+from backend.blockchain.blockchain import Blockchain
+from backend.pubsub import pubsub
+from backend.pubsub.pubsub import PubSub
+from backend.pubsub.publish_queue import PublishQueue, PUBLISH_QUEUE_DEPTH
+from backend.pubsub.transport import (
+    InMemoryBroker,
+    InMemoryTransport,
+    Transport,
+    SocketBroker,
+    SocketTransport,
+)
+from backend.wallet.transaction import Transaction
+from backend.wallet.transaction_pool import TransactionPool
+from backend.wallet.wallet import Wallet
+
+
+class Node:
+    def __init__(self, transport, blockchain=None, **kwargs) -> None:
+        self.blockchain = blockchain or Blockchain()
+        self.transaction_pool = TransactionPool()
+        self.pubsub = PubSub(
+            self.blockchain, self.transaction_pool, transport=transport, **kwargs
+        )
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_in_memory_broadcast_transaction():
+    broker = InMemoryBroker()
+    node_1 = Node(InMemoryTransport(broker))
+    node_2 = Node(InMemoryTransport(broker))
+    transaction = Transaction(Wallet(node_1.blockchain), "recipt", 10)
+
+    node_1.pubsub.broadcast_transactions(transaction)
+    node_1.pubsub.flush()
+
+    assert transaction.id in node_2.transaction_pool.transaction_map
+    assert node_2.transaction_pool.transaction_map[transaction.id] is not transaction
+
+
+def test_in_memory_broadcast_block():
+    broker = InMemoryBroker()
+    node_1 = Node(InMemoryTransport(broker))
+    node_2 = Node(InMemoryTransport(broker))
+    node_1.blockchain.add_block([Transaction(Wallet(), "recipt", 10).serialize()])
+
+    node_1.pubsub.broadcast_block(node_1.blockchain.chain[-1])
+
+    assert wait_for(
+        lambda: node_2.blockchain.chain[-1].hash == node_1.blockchain.chain[-1].hash
+    )
+
+
+@pytest.mark.parametrize("wire_format", ["json", "binary"])
+def test_socket_broadcast_transaction(wire_format):
+    broker = SocketBroker(port=0).start()
+    host, port = broker.address
+    node_1 = Node(SocketTransport(host, port))
+    node_2 = Node(SocketTransport(host, port))
+    node_1.pubsub.wire_format = wire_format
+    transaction = Transaction(Wallet(), "recipt", 10)
+
+    try:
+        node_1.pubsub.broadcast_transactions(transaction)
+        assert wait_for(
+            lambda: transaction.id in node_2.transaction_pool.transaction_map
+        )
+    finally:
+        node_1.pubsub.transport.close()
+        node_2.pubsub.transport.close()
+        broker.close()
+
+
+@pytest.mark.parametrize("bad_message", ["not json", {"block_hash": None}, [1]])
+def test_socket_receive_survives_bad_messages(bad_message):
+    broker = SocketBroker(port=0).start()
+    host, port = broker.address
+    sender = SocketTransport(host, port)
+    node = Node(SocketTransport(host, port))
+    transaction = Transaction(Wallet(), "recipt", 10)
+
+    try:
+        sender.send({"channel": pubsub.CHANNELS["BLOCK"], "message": bad_message})
+        sender.send({"channel": pubsub.CHANNELS["GET_TRANSACTIONS"]})
+        sender.send({"not": "a frame"})
+        sender.publish(pubsub.CHANNELS["TRANSACTION"], transaction.serialize())
+        assert wait_for(lambda: transaction.id in node.transaction_pool.transaction_map)
+    finally:
+        sender.close()
+        node.pubsub.transport.close()
+        broker.close()
+
+
+def test_in_memory_publish_survives_bad_messages():
+    broker = InMemoryBroker()
+    node_1 = Node(InMemoryTransport(broker))
+    node_2 = Node(InMemoryTransport(broker))
+    transaction = Transaction(Wallet(), "recipt", 10)
+
+    broker.publish(pubsub.CHANNELS["BLOCK"], {"block_hash": None})
+    broker.publish(pubsub.CHANNELS["TRANSACTION"], transaction.serialize())
+
+    assert transaction.id in node_1.transaction_pool.transaction_map
+    assert transaction.id in node_2.transaction_pool.transaction_map
+
+
+def test_socket_broker_leaves_stdlib_server_alone():
+    broker = SocketBroker(port=0)
+    broker.server.server_close()
+
+    assert broker.server.allow_reuse_address
+    assert not socketserver.ThreadingTCPServer.allow_reuse_address
+
+
+class RecordingTransport(Transport):
+    def __init__(self, gate=None) -> None:
+        self.published = []
+        self.gate = gate
+
+    def subscribe(self, channels, callback):
+        pass
+
+    def publish(self, channel, message):
+        if self.gate:
+            self.gate.wait()
+        self.published.append((channel, message))
+
+
+def test_transport_must_implement_publish():
+    class SubscribeOnlyTransport(Transport):
+        def subscribe(self, channels, callback):
+            pass
+
+    with pytest.raises(TypeError):
+        SubscribeOnlyTransport()
+
+
+def test_in_memory_broadcast_transactions_batched():
+    broker = InMemoryBroker()
+    node_1 = Node(InMemoryTransport(broker))
+    node_2 = Node(InMemoryTransport(broker))
+    transactions = [Transaction(Wallet(), "recipt", 10) for _ in range(5)]
+
+    for transaction in transactions:
+        node_1.pubsub.broadcast_transactions(transaction)
+    node_1.pubsub.flush()
+
+    assert all(
+        transaction.id in node_2.transaction_pool.transaction_map
+        for transaction in transactions
+    )
+
+
+def test_publish_queue_batches_burst():
+    gate = threading.Event()
+    transport = RecordingTransport(gate)
+    publish_queue = PublishQueue(transport, batch_size=3)
+
+    publish_queue.put("TRANSACTION", {"id": 0}, batchable=True)
+    assert wait_for(lambda: publish_queue.queue.qsize() == 0)
+    for i in range(1, 6):
+        publish_queue.put("TRANSACTION", {"id": i}, batchable=True)
+    publish_queue.put("BLOCK", {"hash": "a"})
+    publish_queue.put("TRANSACTION", {"id": 6}, batchable=True)
+    gate.set()
+    publish_queue.flush()
+
+    assert transport.published == [
+        ("TRANSACTION", {"id": 0}),
+        ("TRANSACTION", {"batch": [{"id": 1}, {"id": 2}, {"id": 3}]}),
+        ("TRANSACTION", {"batch": [{"id": 4}, {"id": 5}]}),
+        ("BLOCK", {"hash": "a"}),
+        ("TRANSACTION", {"id": 6}),
+    ]
+    stats = publish_queue.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["published"] == 8
+    assert stats["batches"] == 5
+    assert stats["latency_max"] > 0
+
+
+def test_publish_queue_batches_within_max_bytes():
+    gate = threading.Event()
+    transport = RecordingTransport(gate)
+    transaction_json = Transaction(Wallet(), "recipt", 10).serialize()
+    size = len(json.dumps(transaction_json))
+    batch_bytes = 3 * size + 30
+    publish_queue = PublishQueue(transport, batch_bytes=batch_bytes)
+
+    publish_queue.put("BLOCK", {"hash": "a"})
+    assert wait_for(lambda: publish_queue.queue.qsize() == 0)
+    messages = [dict(transaction_json, id=str(i)) for i in range(7)]
+    messages.insert(3, {"id": "big", "padding": "x" * batch_bytes})
+    for message in messages:
+        publish_queue.put("TRANSACTION", message, batchable=True)
+    gate.set()
+    publish_queue.flush()
+
+    batches = [message.get("batch", [message]) for _, message in transport.published]
+    assert [len(batch) for batch in batches] == [1, 3, 1, 3, 1]
+    assert [item for batch in batches[1:] for item in batch] == messages
+    for _, message in transport.published:
+        assert "batch" not in message or len(json.dumps(message)) <= batch_bytes
+
+
+def test_publish_queue_full():
+    gate = threading.Event()
+    publish_queue = PublishQueue(RecordingTransport(gate), max_size=1, timeout=0.01)
+    depth = PUBLISH_QUEUE_DEPTH.value
+
+    publish_queue.put("TEST", {"foo": 1})
+    assert wait_for(lambda: publish_queue.queue.qsize() == 0)
+    publish_queue.put("TEST", {"foo": 2})
+
+    with pytest.raises(Exception, match="The publish queue is full"):
+        publish_queue.put("TEST", {"foo": 3})
+    assert PUBLISH_QUEUE_DEPTH.value == depth + 2
+
+    gate.set()
+    publish_queue.flush()
+    assert PUBLISH_QUEUE_DEPTH.value == depth
+
+
+def same_chain(node_1, node_2):
+    return [block.hash for block in node_1.blockchain.chain] == [
+        block.hash for block in node_2.blockchain.chain
+    ]
+
+
+def record(broker):
+    """
+    the messages published to the broker, recorded before any node handles them.
+    Subscribe it before the nodes, nodes publish their replies while handling a message
+    """
+    published = []
+    broker.subscribe(pubsub.CHANNELS.values(), lambda *args: published.append(args))
+    return published
+
+
+def mined_node(broker, transactions):
+    node = Node(InMemoryTransport(broker), async_publish=False)
+    reward = Transaction.reward_transaction(Wallet()).serialize()
+    data = [transaction.serialize() for transaction in transactions] + [reward]
+    node.blockchain.add_block(json.loads(json.dumps(data)))
+    return node
+
+
+def test_compact_block_rebuilt_from_pool():
+    broker = InMemoryBroker()
+    published = record(broker)
+    transactions = [Transaction(Wallet(), "recipt", 10) for _ in range(3)]
+    node_1 = mined_node(broker, transactions)
+    node_2 = Node(InMemoryTransport(broker), async_publish=False)
+    for transaction in transactions:
+        node_2.transaction_pool.set_transaction(transaction)
+
+    node_1.pubsub.broadcast_block(node_1.blockchain.chain[-1])
+
+    assert same_chain(node_1, node_2)
+    assert [channel for channel, message in published] == ["COMPACT_BLOCK"]
+    assert published[0][1]["transaction_ids"] == [
+        transaction_json["id"] for transaction_json in node_1.blockchain.chain[-1].data
+    ]
+    assert node_2.transaction_pool.transaction_map == {}
+
+
+def test_compact_block_requests_missing_transactions():
+    broker = InMemoryBroker()
+    published = record(broker)
+    transactions = [Transaction(Wallet(), "recipt", 10) for _ in range(3)]
+    node_1 = mined_node(broker, transactions)
+    node_2 = Node(InMemoryTransport(broker), async_publish=False)
+    node_2.transaction_pool.set_transaction(transactions[0])
+
+    node_1.pubsub.broadcast_block(node_1.blockchain.chain[-1])
+
+    assert same_chain(node_1, node_2)
+    assert [channel for channel, message in published] == [
+        "COMPACT_BLOCK",
+        "GET_TRANSACTIONS",
+        "BLOCK_TRANSACTIONS",
+    ]
+    assert published[1][1]["transaction_ids"] == [
+        transactions[1].id,
+        transactions[2].id,
+    ]
+
+
+def test_compact_block_falls_back_to_full_block():
+    broker = InMemoryBroker()
+    published = record(broker)
+    wallet = Wallet()
+    transaction = Transaction(wallet, "recipt", 10)
+    node_1 = mined_node(broker, [transaction])
+    node_2 = Node(InMemoryTransport(broker), async_publish=False)
+    transaction.update(wallet, "other_recipt", 5)
+    node_2.transaction_pool.set_transaction(transaction)
+
+    node_1.pubsub.broadcast_block(node_1.blockchain.chain[-1])
+
+    assert same_chain(node_1, node_2)
+    assert [channel for channel, message in published] == [
+        "COMPACT_BLOCK",
+        "GET_BLOCK",
+        "BLOCK",
+    ]
+
+
+def test_full_block_relay():
+    broker = InMemoryBroker()
+    node_1 = mined_node(broker, [Transaction(Wallet(), "recipt", 10)])
+    node_1.pubsub.block_relay = "full"
+    node_2 = Node(InMemoryTransport(broker))
+
+    node_1.pubsub.broadcast_block(node_1.blockchain.chain[-1])
+    node_1.pubsub.flush()
+
+    assert same_chain(node_1, node_2)
@@ -1,4 +1,4 @@
-from backend.util.crypto_hash import crypto_hash
+from backend.util.crypto_hash import crypto_hash, CryptoHashTemplate
 
 
 def test_crypto_hash():
@@ -8,3 +8,15 @@ def test_crypto_hash():
         crypto_hash("foo")
         == "b2213295d564916f89a6a42455567c87c3f480fcd7a1c15e220f17d7169a790b"
     )
+
+
+def test_crypto_hash_template():
+    data = [{"id": "abc", "output": {"foo": 12}}]
+    template = CryptoHashTemplate("last_hash", data)
+
+    for timestamp, defficulty, nonce in [(1, 4, 0), (1697000000000000000, 3, 98765)]:
+        assert template.hash(timestamp, defficulty, nonce) == crypto_hash(
+            timestamp, "last_hash", data, defficulty, nonce
+        )
+
+    assert CryptoHashTemplate(-5, True, "x").hash(7) == crypto_hash(-5, True, "x", 7)
@@ -0,0 +1,34 @@
+import pytest
+from backend.util.merkle import merkle_root, merkle_proof, verify_merkle_proof
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8])
+def test_merkle_proof(count):
+    items = [{"id": i} for i in range(count)]
+    root = merkle_root(items)
+
+    for index, item in enumerate(items):
+        assert verify_merkle_proof(item, merkle_proof(items, index), root)
+
+
+def test_merkle_root_changes_with_items():
+    items = ["one", "two", "three"]
+
+    assert merkle_root(items) != merkle_root(["one", "two", "four"])
+    assert merkle_root(items) != merkle_root(["two", "one", "three"])
+    assert merkle_root(items) != merkle_root(items[:2])
+
+
+def test_merkle_proof_wrong_item():
+    items = ["one", "two", "three"]
+    proof = merkle_proof(items, 1)
+
+    assert not verify_merkle_proof("four", proof, merkle_root(items))
+    assert not verify_merkle_proof("two", proof, merkle_root(["one", "two"]))
+
+
+def test_merkle_proof_malformed():
+    items = ["one", "two"]
+
+    assert not verify_merkle_proof("one", [["up", "00"]], merkle_root(items))
+    assert not verify_merkle_proof("one", [["right", "zz"]], merkle_root(items))
@@ -0,0 +1,78 @@
+import pytest
+from backend.util.metrics import Registry, Counter, Gauge, Histogram
+
+
+def test_counter():
+    registry = Registry()
+    counter = Counter("blocks_total", "Blocks", registry=registry)
+    counter.inc()
+    counter.inc(2)
+
+    assert registry.render() == (
+        "# HELP blocks_total Blocks\n# TYPE blocks_total counter\nblocks_total 3\n"
+    )
+
+
+def test_gauge():
+    registry = Registry()
+    gauge = Gauge("depth", "Depth", registry=registry)
+    gauge.set(5)
+    gauge.dec(2)
+
+    assert "depth 3\n" in registry.render()
+
+
+def test_function_value():
+    registry = Registry()
+    items = [1, 2]
+    Gauge("items", "Items", registry=registry, function=lambda: len(items))
+    items.append(3)
+
+    assert "items 3\n" in registry.render()
+
+
+def test_labels():
+    registry = Registry()
+    counter = Counter("messages_total", "Messages", ["channel"], registry=registry)
+    counter.labels("BLOCK").inc()
+    counter.labels('say "hi"').inc(2)
+
+    text = registry.render()
+
+    assert 'messages_total{channel="BLOCK"} 1\n' in text
+    assert 'messages_total{channel="say \\"hi\\""} 2\n' in text
+    with pytest.raises(Exception, match="takes labels"):
+        counter.labels()
+
+
+def test_histogram():
+    registry = Registry()
+    histogram = Histogram("seconds", "Seconds", registry=registry, buckets=(1, 2))
+    histogram.observe(0.5)
+    histogram.observe(1.5)
+    histogram.observe(3)
+
+    assert registry.render().splitlines()[2:] == [
+        'seconds_bucket{le="1"} 1',
+        'seconds_bucket{le="2"} 2',
+        'seconds_bucket{le="+Inf"} 3',
+        "seconds_sum 5.0",
+        "seconds_count 3",
+    ]
+
+
+def test_histogram_time():
+    registry = Registry()
+    histogram = Histogram("seconds", "Seconds", ["result"], registry=registry)
+    with histogram.labels("ok").time():
+        pass
+
+    assert 'seconds_count{result="ok"} 1\n' in registry.render()
+
+
+def test_duplicate_metric():
+    registry = Registry()
+    Counter("blocks_total", "Blocks", registry=registry)
+
+    with pytest.raises(Exception, match="already registered"):
+        Gauge("blocks_total", "Blocks", registry=registry)
@@ -0,0 +1,30 @@
+from backend.util.crypto_hash import crypto_hash
+from backend.util.hex_to_binary import hex_to_binry
+from backend.util.proof_of_work import (
+    defficulty_target,
+    digest_meets_target,
+    meets_defficulty,
+)
+
+
+def test_meets_defficulty():
+    assert meets_defficulty("0fff", 4)
+    assert not meets_defficulty("0fff", 5)
+    assert not meets_defficulty("fff", 1)
+    assert not meets_defficulty("00", 9)
+
+
+def test_meets_defficulty_matches_hex_to_binary():
+    for i in range(50):
+        hash = crypto_hash(i)
+        for defficulty in range(1, 8):
+            assert meets_defficulty(hash, defficulty) == (
+                hex_to_binry(hash)[0:defficulty] == "0" * defficulty
+            )
+
+
+def test_digest_meets_target():
+    digest = bytes.fromhex("07" + "ff" * 31)
+
+    assert digest_meets_target(digest, defficulty_target(5))
+    assert not digest_meets_target(digest, defficulty_target(6))
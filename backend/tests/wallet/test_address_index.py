@@ -0,0 +1,87 @@
+from backend.blockchain.blockchain import Blockchain
+from backend.wallet.address_index import AddressIndex
+from backend.wallet.transaction import Transaction
+from backend.wallet.wallet import Wallet
+
+
+def test_address_index_search():
+    blockchain = Blockchain()
+    blockchain.add_block(
+        [
+            Transaction(Wallet(), "xyc1", 1).serialize(),
+            Transaction(Wallet(), "xyd2", 1).serialize(),
+        ]
+    )
+    blockchain.add_block([Transaction(Wallet(), "xyc3", 1).serialize()])
+
+    index = AddressIndex()
+    index.sync(blockchain.chain)
+
+    assert index.search("xyc") == ["xyc1", "xyc3"]
+    assert index.search("xy", offset=1, limit=1) == ["xyc3"]
+    assert index.search("zzz") == []
+    assert len(index.search()) == 6
+
+
+def test_address_index_search_negative_offset_and_limit():
+    blockchain = Blockchain()
+    blockchain.add_block([Transaction(Wallet(), "xyc1", 1).serialize()])
+    blockchain.add_block([Transaction(Wallet(), "xyd2", 1).serialize()])
+
+    index = AddressIndex()
+    index.sync(blockchain.chain)
+
+    assert index.search("xyd", offset=-1) == ["xyd2"]
+    assert index.search("xy", limit=-1) == []
+
+
+def test_address_index_search_merges_new_addresses():
+    blockchain = Blockchain()
+    blockchain.add_block([Transaction(Wallet(), "xyd2", 1).serialize()])
+    index = AddressIndex()
+    index.sync(blockchain.chain)
+    before = index.search("xy")
+
+    blockchain.add_block(
+        [
+            Transaction(Wallet(), "xyd4", 1).serialize(),
+            Transaction(Wallet(), "xyc1", 1).serialize(),
+        ]
+    )
+    index.sync(blockchain.chain)
+
+    assert index.search("xy") == ["xyc1", "xyd2", "xyd4"]
+    assert index.search() == sorted(index.addresses)
+    assert before == ["xyd2"]
+
+
+def test_known_addresses_follow_the_chain():
+    blockchain = Blockchain()
+    blockchain.add_block([Transaction(Wallet(), "recip1", 1).serialize()])
+    assert "recip1" in blockchain.known_addresses()
+
+    fork = Blockchain()
+    fork.add_block([Transaction(Wallet(), "recip2", 1).serialize()])
+    fork.add_block([Transaction(Wallet(), "recip3", 1).serialize()])
+    blockchain.replace_chain(fork.chain)
+
+    assert blockchain.known_addresses("recip") == ["recip2", "recip3"]
+
+
+def test_address_index_transaction_locations():
+    blockchain = Blockchain()
+    wallet = Wallet(blockchain)
+    blockchain.add_block([Transaction(Wallet(), wallet.address, 1).serialize()])
+    blockchain.add_block(
+        [
+            Transaction(Wallet(), "recip1", 1).serialize(),
+            Transaction(wallet, "recip1", 1).serialize(),
+        ]
+    )
+
+    index = AddressIndex()
+    index.sync(blockchain.chain)
+
+    assert index.transaction_locations(wallet.address) == [(1, 0), (2, 1)]
+    assert index.transaction_locations("recip1") == [(2, 0), (2, 1)]
+    assert index.transaction_locations("unknown") == []
@@ -0,0 +1,37 @@
+from backend.config import STARTING_BALANCE
+from backend.wallet.ledger import Ledger
+from backend.wallet.wallet import Wallet
+from backend.wallet.transaction import Transaction
+from backend.blockchain.blockchain import Blockchain
+
+
+def test_ledger_reset_on_own_transaction():
+    blockchain = Blockchain()
+    wallet = Wallet(blockchain)
+
+    blockchain.add_block([Transaction(Wallet(), wallet.address, 30).serialize()])
+    blockchain.add_block([Transaction(wallet, "recip", 50).serialize()])
+
+    ledger = Ledger.from_chain(blockchain.chain)
+
+    assert ledger.balance(wallet.address) == STARTING_BALANCE + 30 - 50
+    assert ledger.balance("recip") == STARTING_BALANCE + 50
+    assert ledger.balance("unknown") == STARTING_BALANCE
+
+
+def test_ledger_sync_rebuilds_on_replaced_chain():
+    wallet = Wallet()
+    blockchain = Blockchain()
+    blockchain.add_block([Transaction(wallet, "recip", 10).serialize()])
+
+    ledger = Ledger.from_chain(blockchain.chain)
+    assert ledger.balance(wallet.address) == STARTING_BALANCE - 10
+
+    fork = Blockchain()
+    fork.add_block([Transaction(wallet, "recip", 20).serialize()])
+    fork.add_block([Transaction(Wallet(), "recip", 5).serialize()])
+    ledger.sync(fork.chain)
+
+    assert ledger.height == len(fork.chain)
+    assert ledger.balance(wallet.address) == STARTING_BALANCE - 20
+    assert ledger.balance("recip") == STARTING_BALANCE + 25
@@ -1,3 +1,5 @@
+import json
+import threading
 from backend.wallet.transaction_pool import TransactionPool
 from backend.wallet.transaction import Transaction
 from backend.wallet.wallet import Wallet
@@ -40,3 +42,182 @@ def test_clear_blockchain_transaction():
     assert not transaction_1.id in transaction_pool.transaction_map
     assert not transaction_2.id in transaction_pool.transaction_map
     assert not transaction_3.id in transaction_pool.transaction_map
+
+
+def test_existing_transaction():
+    transaction_pool = TransactionPool()
+    wallet = Wallet()
+    transaction = Transaction(wallet, "reci", 1)
+    transaction_pool.set_transaction(Transaction(Wallet(), "reci", 2))
+    transaction_pool.set_transaction(transaction)
+
+    assert transaction_pool.existing_transaction(wallet.address) == transaction
+    assert transaction_pool.existing_transaction(Wallet().address) is None
+
+
+def test_clear_blockchain_transactions_only_new_blocks():
+    transaction_pool = TransactionPool()
+    blockchain = Blockchain()
+    transaction_1 = Transaction(Wallet(), "recip1", 10)
+    blockchain.add_block([transaction_1.serialize()])
+    transaction_pool.clear_blockchain_transactions(blockchain)
+
+    # a transaction of an already cleared block is not looked for again
+    transaction_pool.set_transaction(transaction_1)
+    transaction_2 = Transaction(Wallet(), "recip2", 20)
+    transaction_pool.set_transaction(transaction_2)
+    blockchain.add_block([transaction_2.serialize()])
+    transaction_pool.clear_blockchain_transactions(blockchain)
+
+    assert transaction_1.id in transaction_pool.transaction_map
+    assert transaction_2.id not in transaction_pool.transaction_map
+    assert transaction_pool.existing_transaction(transaction_2.input["address"]) is None
+
+    # a replaced chain is walked from the start
+    fork = Blockchain()
+    fork.add_block([transaction_1.serialize()])
+    fork.add_block([Transaction(Wallet(), "recip3", 30).serialize()])
+    blockchain.chain = fork.chain
+    transaction_pool.clear_blockchain_transactions(blockchain)
+
+    assert transaction_1.id not in transaction_pool.transaction_map
+
+
+def test_pool_evicts_lowest_priority_over_limit():
+    transaction_pool = TransactionPool(limit=2)
+    transactions = [Transaction(Wallet(), "recip", i + 1) for i in range(3)]
+    for transaction in transactions:
+        transaction_pool.set_transaction(transaction)
+
+    assert list(transaction_pool.transaction_map) == [
+        transactions[0].id,
+        transactions[1].id,
+    ]
+    assert transaction_pool.existing_transaction(transactions[2].input["address"]) is None
+
+
+def test_set_transaction_rejected_when_full():
+    transaction_pool = TransactionPool(limit=1)
+    transaction = Transaction(Wallet(), "recip", 1)
+
+    assert transaction_pool.set_transaction(transaction)
+    assert not transaction_pool.set_transaction(Transaction(Wallet(), "recip", 2))
+    assert list(transaction_pool.transaction_map) == [transaction.id]
+
+
+def test_set_transaction_accounts_updated_transaction():
+    wallet = Wallet()
+    transaction = Transaction(wallet, "recip", 1)
+    transaction_pool = TransactionPool()
+    transaction_pool.set_transaction(transaction)
+
+    timestamp = transaction.input["timestamp"]
+    transaction.update(wallet, "other_recipient", 2)
+    transaction_pool.set_transaction(transaction)
+
+    size = len(json.dumps(transaction.serialize()))
+    assert transaction_pool.total_bytes == size
+    assert transaction_pool.entries[transaction.id][0] == timestamp
+    assert transaction_pool.select_transactions(size) == [transaction.serialize()]
+
+
+def test_set_transaction_update_on_full_pool_keeps_its_place():
+    wallet = Wallet()
+    transaction = Transaction(wallet, "recip", 1)
+    other = Transaction(Wallet(), "recip", 2)
+    transaction_pool = TransactionPool(
+        max_bytes=len(json.dumps(transaction.serialize()))
+        + len(json.dumps(other.serialize()))
+    )
+    transaction_pool.set_transaction(transaction)
+    transaction_pool.set_transaction(other)
+
+    transaction.update(wallet, "other_recipient", 2)
+
+    assert transaction_pool.set_transaction(transaction)
+    assert list(transaction_pool.transaction_map) == [transaction.id]
+
+
+def test_set_transaction_rejected_update_keeps_original():
+    wallet = Wallet()
+    transaction = Transaction(wallet, "recip", 1)
+    size = len(json.dumps(transaction.serialize()))
+    transaction_pool = TransactionPool(max_bytes=size)
+    transaction_pool.set_transaction(transaction)
+
+    updated = Transaction(
+        id=transaction.id, output=dict(transaction.output), input=transaction.input
+    )
+    updated.update(wallet, "other_recipient", 2)
+
+    assert not transaction_pool.set_transaction(updated)
+    assert transaction_pool.transaction_map == {transaction.id: transaction}
+    assert transaction_pool.total_bytes == size
+    assert transaction_pool.select_transactions() == [transaction.serialize()]
+
+
+def test_pool_is_safe_across_threads():
+    transaction_pool = TransactionPool(limit=50)
+    transactions = [Transaction(Wallet(), "recip", i + 1) for i in range(100)]
+    errors = []
+
+    def add(transactions):
+        for transaction in transactions:
+            transaction_pool.set_transaction(transaction)
+
+    def select():
+        try:
+            for _ in range(100):
+                transaction_pool.select_transactions()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=add, args=(transactions[:50],)),
+        threading.Thread(target=add, args=(transactions[50:],)),
+        threading.Thread(target=select),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(transaction_pool.transaction_map) == 50
+    assert transaction_pool.total_bytes == sum(
+        size for _, _, size in transaction_pool.entries.values()
+    )
+
+
+def test_pool_evicts_over_max_bytes():
+    transaction = Transaction(Wallet(), "recip", 1)
+    size = len(json.dumps(transaction.serialize()))
+    transaction_pool = TransactionPool(max_bytes=size)
+    transaction_pool.set_transaction(transaction)
+    transaction_pool.set_transaction(Transaction(Wallet(), "recip", 2))
+
+    assert list(transaction_pool.transaction_map) == [transaction.id]
+    assert transaction_pool.total_bytes == size
+
+
+def test_select_transactions_within_budget():
+    transaction_pool = TransactionPool()
+    transactions = [Transaction(Wallet(), "recip", i + 1) for i in range(3)]
+    for transaction in reversed(transactions):
+        transaction_pool.set_transaction(transaction)
+    size = len(json.dumps(transactions[0].serialize()))
+
+    selected = transaction_pool.select_transactions(2 * size + 10)
+
+    assert [transaction["id"] for transaction in selected] == [
+        transactions[0].id,
+        transactions[1].id,
+    ]
+
+
+def test_select_transactions_drops_expired():
+    transaction_pool = TransactionPool(max_age=0)
+    transaction_pool.set_transaction(Transaction(Wallet(), "recip", 1))
+
+    assert transaction_pool.select_transactions() == []
+    assert transaction_pool.transaction_map == {}
@@ -1,3 +1,4 @@
+import json
 from backend.wallet.wallet import Wallet
 from backend.wallet.transaction import Transaction
 import pytest
@@ -123,3 +124,29 @@ def test_invalid_reward_invalid_transaction_amount():
 
     with pytest.raises(Exception, match="Invalid mining reward"):
         Transaction.is_valid_transaction(reward_transaction)
+
+
+def test_serialize():
+    transaction = Transaction(Wallet(), "recipient", 50)
+    transaction_json = transaction.serialize()
+
+    assert list(transaction_json) == ["id", "output", "input"]
+    assert transaction_json["input"] is transaction.input
+    assert Transaction.from_json(transaction_json).serialize() == transaction_json
+
+
+def test_compact_json_round_trip():
+    transaction_json = json.loads(
+        json.dumps(Transaction(Wallet(), "recipient", 50).serialize())
+    )
+    compact_json = Transaction.compact_json(transaction_json)
+
+    assert json.dumps(compact_json) == json.dumps(transaction_json)
+    assert isinstance(compact_json["input"]["signature"], tuple)
+    assert Transaction.from_json(compact_json).serialize() == compact_json
+    Transaction.is_valid_transaction(Transaction.from_json(compact_json))
+
+
+def test_compact_json_leaves_other_data():
+    assert Transaction.compact_json("test-data") == "test-data"
+    assert Transaction.compact_json({"id": "a"}) == {"id": "a"}
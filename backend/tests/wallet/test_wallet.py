@@ -1,4 +1,5 @@
 from backend.config import STARTING_BALANCE
+from backend.wallet import wallet as wallet_module
 from backend.wallet.wallet import Wallet
 from backend.blockchain.blockchain import Blockchain
 from backend.wallet.transaction import Transaction
@@ -59,3 +60,63 @@ def test_reward_transaction():
 
     assert transaction.input == MINING_REWARD_INPUT
     assert transaction.output[miner_wallet.address] == MINING_REWARD
+
+
+def test_verify_caches_results():
+    data = {"foo": "test_data"}
+    wallet = Wallet()
+    signature = wallet.sign(data)
+
+    assert Wallet.verify(wallet.public_key, data, signature)
+    hits = Wallet.cache_info()["signatures"]["hits"]
+
+    assert Wallet.verify(wallet.public_key, data, list(signature))
+    assert Wallet.cache_info()["signatures"]["hits"] == hits + 1
+    assert not Wallet.verify(wallet.public_key, {"foo": "other"}, signature)
+
+
+def test_signature_cache_hits_counter_is_monotonic():
+    data = {"foo": "test_data"}
+    wallet = Wallet()
+    signature = wallet.sign(data)
+    Wallet.verify(wallet.public_key, data, signature)
+    hits = wallet_module.SIGNATURE_CACHE_HITS.get()
+
+    Wallet.verify(wallet.public_key, data, signature)
+    Wallet.verify_batch([(wallet.public_key, data, signature)])
+    assert wallet_module.SIGNATURE_CACHE_HITS.get() == hits + 2
+
+    wallet_module.SIGNATURE_CACHE.clear()
+    assert wallet_module.SIGNATURE_CACHE_HITS.get() == hits + 2
+
+
+def test_verify_batch_parallel(monkeypatch):
+    monkeypatch.setattr("backend.wallet.wallet.PARALLEL_VERIFY_THRESHOLD", 1)
+    wallet = Wallet()
+    signed_items = []
+    for i in range(4):
+        data = {"foo": i}
+        signed_items.append((wallet.public_key, data, wallet.sign(data)))
+    signed_items.append((Wallet().public_key, {"foo": 0}, wallet.sign({"foo": 0})))
+
+    assert Wallet.verify_batch(signed_items, workers=2) == [True] * 4 + [False]
+
+    executor = wallet_module.VERIFY_EXECUTORS[2]
+    Wallet.verify_batch(signed_items, workers=2)
+    assert wallet_module.VERIFY_EXECUTORS[2] is executor
+
+
+def test_verify_batch_malformed_items():
+    data = {"foo": "test_data"}
+    wallet = Wallet()
+    signature = wallet.sign(data)
+    signed_items = [
+        ("not a public key", data, signature),
+        (wallet.public_key, data, ("not", "numbers")),
+        (wallet.public_key, data, ([1], [2])),
+        (wallet.public_key, data, signature),
+    ]
+
+    assert Wallet.verify_batch(signed_items) == [False, False, False, True]
+    with pytest.raises(ValueError):
+        Wallet.verify("not a public key", data, signature)
@@ -0,0 +1,46 @@
+import threading
+
+
+class ChainIndex:
+    """
+    Base of the indexes built from the blocks of a chain.
+
+    Remembers the height and tip hash it was built up to, so it can be brought up to date
+    by applying only the blocks added since. Subclasses index the block data in
+    apply_block and clear their data in reset
+    """
+
+    def __init__(self) -> None:
+        self.height = 0
+        self.tip_hash = None
+        self.lock = threading.Lock()
+
+    def reset(self):
+        self.height = 0
+        self.tip_hash = None
+
+    def apply_block(self, block):
+        """Move the tip to the block"""
+        self.height += 1
+        self.tip_hash = block.hash
+
+    def is_prefix_of(self, chain):
+        """Check that the chain contains the tip of the index at the same height"""
+        return (
+            self.height <= len(chain)
+            and self.height > 0
+            and chain[self.height - 1].hash == self.tip_hash
+        )
+
+    def sync(self, chain):
+        """
+        Bring the index up to date with the chain.
+        Only the blocks after the current tip are applied, unless the chain no longer
+        contains the tip, in which case the index is rebuilt from the start
+        """
+        with self.lock:
+            if self.height and not self.is_prefix_of(chain):
+                self.reset()
+
+            for block in chain[self.height :]:
+                self.apply_block(block)
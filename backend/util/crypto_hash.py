@@ -11,6 +11,46 @@ def crypto_hash(*args):
     return hashlib.sha256(joined_data.encode("utf-8")).hexdigest()
 
 
+class CryptoHashTemplate:
+    """
+    Hash a fixed set of arguments together with changing numeric arguments, producing
+    the same hash as crypto_hash(*static_args, *variable_args).
+
+    The static arguments are serialized once. The ones that sort before any number are
+    fed in to a sha-256 state that is copied for each hash, the ones that sort after
+    any number are appended as pre-encoded bytes
+    """
+
+    def __init__(self, *static_args) -> None:
+        stringified_args = sorted(map(lambda arg: json.dumps(arg), static_args))
+
+        # serialized numbers start with "-" or a digit
+        prefix = [arg for arg in stringified_args if arg[:1] < "-"]
+        suffix = [arg for arg in stringified_args if arg[:1] > "9"]
+        self.middle = [arg for arg in stringified_args if "-" <= arg[:1] <= "9"]
+
+        self.prefix_state = hashlib.sha256("".join(prefix).encode("utf-8"))
+        self.suffix_bytes = "".join(suffix).encode("utf-8")
+
+    def digest(self, *variable_args):
+        """
+        Return the raw sha-256 digest of the static arguments and the given numbers
+        """
+        stringified_args = sorted(
+            self.middle + list(map(lambda arg: json.dumps(arg), variable_args))
+        )
+        state = self.prefix_state.copy()
+        state.update("".join(stringified_args).encode("utf-8"))
+        state.update(self.suffix_bytes)
+        return state.digest()
+
+    def hash(self, *variable_args):
+        """
+        Return the sha-256 hex digest of the static arguments and the given numbers
+        """
+        return self.digest(*variable_args).hex()
+
+
 def main():
     print(f"crypto_hash('one', 'two', 'three', 132, 12): {crypto_hash('one', 2, [3])}")
     print(f"crypto_hash('two' 'one', 'three', 132, 12): {crypto_hash(2, 'one', [3])}")
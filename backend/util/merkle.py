@@ -0,0 +1,86 @@
+"""
+Merkle trees over json values.
+
+Leaves are the sha-256 of the json encoding of an item, inner nodes the sha-256 of
+their two children. Leaves and inner nodes are prefixed with different bytes so one can
+never pass for the other. A node without a sibling is moved up a level unchanged
+"""
+import hashlib
+import json
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def merkle_leaf(item):
+    return hashlib.sha256(LEAF_PREFIX + json.dumps(item).encode("utf-8")).digest()
+
+
+def merkle_node(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def merkle_levels(items):
+    """Every level of the tree, from the leaves up to the root"""
+    levels = [[merkle_leaf(item) for item in items]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        levels.append(
+            [
+                merkle_node(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                for i in range(0, len(level), 2)
+            ]
+        )
+    return levels
+
+
+def merkle_root(items):
+    """Return the hex root of the items, the hash of nothing for no items"""
+    if not items:
+        return hashlib.sha256(b"").hexdigest()
+    return merkle_levels(items)[-1][0].hex()
+
+
+def merkle_proof(items, index):
+    """
+    Return the inclusion proof of the item at the index: the hex siblings on the path to
+    the root, each as a [side, hash] pair where side is the side of the sibling
+    """
+    proof = []
+    for level in merkle_levels(items)[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(["left" if sibling < index else "right", level[sibling].hex()])
+        index //= 2
+    return proof
+
+
+def verify_merkle_proof(item, proof, root):
+    """Check that the proof links the item to the hex root"""
+    node = merkle_leaf(item)
+    try:
+        for side, sibling in proof:
+            sibling = bytes.fromhex(sibling)
+            if side == "left":
+                node = merkle_node(sibling, node)
+            elif side == "right":
+                node = merkle_node(node, sibling)
+            else:
+                return False
+    except (TypeError, ValueError):
+        return False
+    return node.hex() == root
+
+
+def main():
+    items = ["one", "two", "three"]
+    root = merkle_root(items)
+    proof = merkle_proof(items, 2)
+
+    print(f"root: {root}")
+    print(f"proof of 'three': {proof}")
+    print(f"valid: {verify_merkle_proof('three', proof, root)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Lightweight metrics rendered in the Prometheus text exposition format.
+
+Metrics register themselves in REGISTRY unless another registry is given. A metric
+with label names holds one child per combination of label values, see labels.
+A function given to a counter or gauge is called for its value when rendering
+"""
+import time
+import threading
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise Exception(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+
+    def unregister(self, name):
+        with self.lock:
+            self.metrics.pop(name, None)
+
+    def render(self):
+        """Return every metric in the Prometheus text format"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{escape_label(value)}"' for name, value in labels)
+    return f"{{{pairs}}}"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values):
+        """The child metric of the given label values"""
+        if len(values) != len(self.labelnames):
+            raise Exception(f"Metric {self.name} takes labels {self.labelnames}")
+
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.child())
+        return child
+
+    def child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        if not self.labelnames:
+            return self.child_samples(self, ())
+
+        samples = []
+        for values, child in sorted(self.children.items()):
+            samples.extend(self.child_samples(child, zip(self.labelnames, values)))
+        return samples
+
+    def child_samples(self, child, labels):
+        return [f"{self.name}{format_labels(tuple(labels))} {format_value(child.get())}"]
+
+
+class Counter(Metric):
+    """A value that only goes up"""
+
+    type = "counter"
+
+    def __init__(
+        self, name, help, labelnames=(), registry=REGISTRY, function=None
+    ) -> None:
+        self.value = 0
+        self.function = function
+        super().__init__(name, help, labelnames, registry)
+
+    def child(self):
+        return Counter(self.name, self.help, registry=None)
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def get(self):
+        return self.function() if self.function else self.value
+
+
+class Gauge(Counter):
+    """A value that goes up and down"""
+
+    type = "gauge"
+
+    def child(self):
+        return Gauge(self.name, self.help, registry=None)
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Histogram(Metric):
+    """Counts of observed values in cumulative buckets, with their sum and count"""
+
+    type = "histogram"
+
+    def __init__(
+        self, name, help, labelnames=(), registry=REGISTRY, buckets=DEFAULT_BUCKETS
+    ) -> None:
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0
+        self.count = 0
+        super().__init__(name, help, labelnames, registry)
+
+    def child(self):
+        return Histogram(self.name, self.help, registry=None, buckets=self.buckets[:-1])
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager observing the seconds spent in its block"""
+        return Timer(self.observe)
+
+    def child_samples(self, child, labels):
+        labels = tuple(labels)
+        with child.lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(child.buckets, counts):
+            cumulative += bucket_count
+            bucket_labels = format_labels(labels + (("le", format_value(bound)),))
+            samples.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        samples.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+        samples.append(f"{self.name}_count{format_labels(labels)} {count}")
+        return samples
+
+
+class Timer:
+    def __init__(self, observe) -> None:
+        self.observe = observe
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.observe(time.perf_counter() - self.start)
@@ -0,0 +1,36 @@
+HASH_BITS = 256
+
+
+def defficulty_target(defficulty, bits=HASH_BITS):
+    """
+    Return the integer target a hash of the given bit length must stay below to have
+    at least defficulty leading zero bits
+    """
+    return 1 << (bits - defficulty)
+
+
+def digest_meets_target(digest, target):
+    """
+    Check the raw digest bytes against an integer target
+    """
+    return int.from_bytes(digest, "big") < target
+
+
+def meets_defficulty(hex_hash, defficulty):
+    """
+    Check that the hex encoded hash starts with at least defficulty zero bits
+    """
+    bits = len(hex_hash) * 4
+    if defficulty > bits:
+        return False
+
+    return int(hex_hash, 16) >> (bits - defficulty) == 0
+
+
+def main():
+    print(f"meets_defficulty('0fff', 4): {meets_defficulty('0fff', 4)}")
+    print(f"meets_defficulty('0fff', 5): {meets_defficulty('0fff', 5)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import heapq
+from bisect import bisect_left
+from backend.util.chain_index import ChainIndex
+
+
+class AddressIndex(ChainIndex):
+    """
+    Sorted index of every address that received an output in the chain.
+    Supports prefix search with pagination.
+
+    Also locates the transactions each address sent or received, as (height, position)
+    pairs in chain order
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.addresses = set()
+        self.sorted_addresses = []
+        self.pending = []
+        self.transactions = {}
+
+    def reset(self):
+        super().reset()
+        self.addresses = set()
+        self.sorted_addresses = []
+        self.pending = []
+        self.transactions = {}
+
+    def apply_block(self, block):
+        """Index the output addresses of the block transactions"""
+        for position, transaction_json in enumerate(block.data):
+            for address in transaction_json["output"]:
+                if address not in self.addresses:
+                    self.addresses.add(address)
+                    self.pending.append(address)
+
+            sender = transaction_json["input"]["address"]
+            for address in {sender, *transaction_json["output"]}:
+                self.transactions.setdefault(address, []).append(
+                    (self.height, position)
+                )
+
+        super().apply_block(block)
+
+    def transaction_locations(self, address):
+        """The (height, position) of every transaction the address sent or received"""
+        with self.lock:
+            return list(self.transactions.get(address, ()))
+
+    def search(self, prefix="", offset=0, limit=None):
+        """
+        Return the sorted addresses starting with the prefix, skipping offset of them and
+        returning at most limit. Negative offsets and limits count as 0
+        """
+        with self.lock:
+            if self.pending:
+                # only the new addresses are sorted, then merged into a new list so a
+                # search running outside the lock keeps its own snapshot
+                self.sorted_addresses = list(
+                    heapq.merge(self.sorted_addresses, sorted(self.pending))
+                )
+                self.pending = []
+            sorted_addresses = self.sorted_addresses
+
+        start = bisect_left(sorted_addresses, prefix)
+        end = len(sorted_addresses)
+        if prefix:
+            end = bisect_left(sorted_addresses, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+        start = min(start + max(offset, 0), end)
+        if limit is not None:
+            end = min(start + max(limit, 0), end)
+
+        return sorted_addresses[start:end]
+
+    def __len__(self):
+        return len(self.addresses)
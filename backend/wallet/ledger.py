@@ -0,0 +1,58 @@
+from backend.config import STARTING_BALANCE
+from backend.util.chain_index import ChainIndex
+
+
+class Ledger(ChainIndex):
+    """
+    Balance index of every address in a chain.
+
+    Follows the same rule as Wallet.calculate_balance: an address that conducts a
+    transaction resets its balance to its own output, any other output adds to it.
+    The ids of the applied transactions are kept to enforce their uniqueness
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.balances = {}
+        self.transaction_ids = set()
+
+    def reset(self):
+        super().reset()
+        self.balances = {}
+        self.transaction_ids = set()
+
+    def balance(self, address):
+        """Return the balance of the address, or the starting balance if it is unknown"""
+        return self.balances.get(address, STARTING_BALANCE)
+
+    def apply_transaction(self, transaction_json):
+        """Apply the outputs of a serialized transaction to the balances"""
+        self.transaction_ids.add(transaction_json["id"])
+        sender = transaction_json["input"]["address"]
+
+        for address, ammount in transaction_json["output"].items():
+            if address == sender:
+                self.balances[address] = ammount
+            else:
+                self.balances[address] = self.balance(address) + ammount
+
+    def apply_block(self, block):
+        """Apply every transaction of the block and move the tip to it"""
+        for transaction_json in block.data:
+            self.apply_transaction(transaction_json)
+
+        super().apply_block(block)
+
+    def copy(self):
+        ledger = Ledger()
+        ledger.balances = dict(self.balances)
+        ledger.transaction_ids = set(self.transaction_ids)
+        ledger.height = self.height
+        ledger.tip_hash = self.tip_hash
+        return ledger
+
+    @staticmethod
+    def from_chain(chain):
+        ledger = Ledger()
+        ledger.sync(chain)
+        return ledger
@@ -1,5 +1,6 @@
 import uuid
 import time
+import sys
 from backend.wallet.wallet import Wallet
 from backend.config import MINING_REWARD, MINING_REWARD_INPUT
 
@@ -10,6 +11,8 @@ class Transaction:
     recipients
     """
 
+    __slots__ = ("id", "output", "input")
+
     def __init__(
         self,
         sender_wallet=None,
@@ -68,13 +71,43 @@ class Transaction:
         self.input = self.create_input(sender_wallet, self.output)
 
     def serialize(self):
-        return self.__dict__
+        return {"id": self.id, "output": self.output, "input": self.input}
 
     def from_json(transaction_json):
         """
         Desrializing the transactions
         """
-        return Transaction(**transaction_json)
+        return Transaction(**Transaction.compact_json(transaction_json))
+
+    @staticmethod
+    def compact_json(transaction_json):
+        """
+        Return the serialized transaction with its ids, addresses and public keys interned,
+        so every copy of them shares one string, and the signature stored as a tuple.
+        The json shape and key order are unchanged, anything else is returned as it is
+        """
+        try:
+            if list(transaction_json) != ["id", "output", "input"]:
+                return transaction_json
+
+            output = {
+                sys.intern(address): ammount
+                for address, ammount in transaction_json["output"].items()
+            }
+            transaction_input = {
+                key: sys.intern(value) if type(value) is str else value
+                for key, value in transaction_json["input"].items()
+            }
+            if isinstance(transaction_input.get("signature"), list):
+                transaction_input["signature"] = tuple(transaction_input["signature"])
+
+            return {
+                "id": sys.intern(transaction_json["id"]),
+                "output": output,
+                "input": transaction_input,
+            }
+        except (AttributeError, TypeError):
+            return transaction_json
 
     @staticmethod
     def is_valid_transaction(transaction):
@@ -99,6 +132,28 @@ class Transaction:
         ):
             raise Exception("Invalid Signature")
 
+    @staticmethod
+    def verify_signatures(transaction_jsons, workers=None):
+        """
+        Verify the signatures of the serialized transactions as one batch, so the following
+        is_valid_transaction calls find their results in the signature cache.
+        Mining rewards and malformed transactions are left to is_valid_transaction
+        """
+        signed_items = []
+        for transaction_json in transaction_jsons:
+            try:
+                transaction_input = transaction_json["input"]
+                if transaction_input == MINING_REWARD_INPUT:
+                    continue
+                (r, s) = transaction_input["signature"]
+                signed_items.append(
+                    (transaction_input["public_key"], transaction_json["output"], (r, s))
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+
+        return Wallet.verify_batch(signed_items, workers)
+
     @staticmethod
     def reward_transaction(miner_wallet):
         """
@@ -112,10 +167,10 @@ class Transaction:
 
 def main():
     trasaction = Transaction(Wallet(), "recipient", 15)
-    print(f"trasaction: {trasaction.__dict__}")
+    print(f"trasaction: {trasaction.serialize()}")
     trasaction_json = trasaction.serialize()
     restored_transaction = Transaction.from_json(trasaction_json)
-    print(f"restored_transaction: {restored_transaction.__dict__}")
+    print(f"restored_transaction: {restored_transaction.serialize()}")
 
 
 if __name__ == "__main__":
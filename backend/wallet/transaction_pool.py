@@ -1,16 +1,151 @@
+import json
+import time
+import heapq
+import itertools
+import threading
+from backend.config import (
+    TRANSACTION_POOL_LIMIT,
+    TRANSACTION_POOL_MAX_BYTES,
+    TRANSACTION_POOL_MAX_AGE,
+    BLOCK_SIZE_LIMIT,
+)
+
+
+def transaction_age_priority(transaction):
+    """Older transactions come first, mining rewards have no input timestamp"""
+    return transaction.input.get("timestamp", 0)
+
+
 class TransactionPool:
-    def __init__(self) -> None:
+    """
+    Transactions waiting to be mined.
+    Indexed by id and by sender address, and remembers the tip of the chain it was last
+    cleared against so only newly added blocks have to be walked.
+
+    The pool is bounded by a transaction count and by the size of the serialized
+    transactions. When it is full the lowest priority transactions are evicted, and
+    transactions older than max_age expire. A lower priority key is a higher priority.
+    The pool is shared by the request handlers and the mining thread, so its methods
+    hold a lock
+    """
+
+    def __init__(
+        self,
+        limit=TRANSACTION_POOL_LIMIT,
+        max_bytes=TRANSACTION_POOL_MAX_BYTES,
+        max_age=TRANSACTION_POOL_MAX_AGE,
+        priority=transaction_age_priority,
+    ) -> None:
         self.transaction_map = {}
+        self.sender_map = {}
+        self.cleared_height = 0
+        self.cleared_hash = None
+
+        self.limit = limit
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.priority = priority
+        self.entries = {}
+        self.total_bytes = 0
+        # max-heap of (-priority, -sequence, id), stale entries are skipped when popped
+        self.eviction_heap = []
+        self.sequence = itertools.count()
+        self.lock = threading.RLock()
 
     def set_transaction(self, transaction):
-        """Set transaction pool"""
+        """
+        Set transaction pool. A transaction already in the pool, like one changed by
+        Transaction.update, is accounted again and keeps its place in the priority order.
+        Return False, leaving the pool as it was, when the pool is full and the
+        transaction would be evicted right away
+        """
+        with self.lock:
+            previous = self.transaction_map.get(transaction.id)
+            previous_order = self.entries.get(transaction.id, (None, None))[:2]
+            self.remove_transaction(transaction.id)
+            self.add_transaction(transaction, *previous_order)
+
+            evicted = self.evict()
+            if transaction.id in self.transaction_map:
+                return True
+
+            for evicted_transaction, order in evicted:
+                if evicted_transaction is not transaction:
+                    self.add_transaction(evicted_transaction, *order)
+            if previous is not None:
+                self.add_transaction(previous, *previous_order)
+            return False
+
+    def add_transaction(self, transaction, priority=None, sequence=None):
         self.transaction_map[transaction.id] = transaction
+        self.sender_map.setdefault(transaction.input["address"], {})[
+            transaction.id
+        ] = None
+
+        size = len(json.dumps(transaction.serialize()))
+        if priority is None:
+            priority = self.priority(transaction)
+            sequence = next(self.sequence)
+        self.entries[transaction.id] = (priority, sequence, size)
+        self.total_bytes += size
+        heapq.heappush(self.eviction_heap, (-priority, -sequence, transaction.id))
+
+    def evict(self):
+        """
+        Evict the lowest priority transactions until the pool is within its limits.
+        Return the evicted transactions with their (priority, sequence)
+        """
+        evicted = []
+        with self.lock:
+            while self.eviction_heap and (
+                len(self.transaction_map) > self.limit
+                or self.total_bytes > self.max_bytes
+            ):
+                priority, sequence, transaction_id = heapq.heappop(self.eviction_heap)
+                if self.entries.get(transaction_id, ())[:2] == (-priority, -sequence):
+                    evicted.append(
+                        (self.transaction_map[transaction_id], (-priority, -sequence))
+                    )
+                    self.remove_transaction(transaction_id)
+
+            if len(self.eviction_heap) > 2 * len(self.entries) + 64:
+                self.eviction_heap = [
+                    (-priority, -sequence, transaction_id)
+                    for transaction_id, (priority, sequence, _) in self.entries.items()
+                ]
+                heapq.heapify(self.eviction_heap)
+
+        return evicted
+
+    def expire(self, now=None):
+        """Remove the transactions whose input is older than max_age"""
+        now = now or time.time_ns()
+        with self.lock:
+            for transaction_id, transaction in list(self.transaction_map.items()):
+                if now - transaction.input.get("timestamp", now) > self.max_age:
+                    self.remove_transaction(transaction_id)
+
+    def remove_transaction(self, transaction_id):
+        """Remove the transaction from the pool and the sender index"""
+        with self.lock:
+            transaction = self.transaction_map.pop(transaction_id, None)
+            if transaction is None:
+                return
+
+            _, _, size = self.entries.pop(transaction_id)
+            self.total_bytes -= size
+
+            address = transaction.input["address"]
+            sender_transactions = self.sender_map.get(address, {})
+            sender_transactions.pop(transaction_id, None)
+            if not sender_transactions:
+                self.sender_map.pop(address, None)
 
     def existing_transaction(self, address):
         """Find the transaction by the address in the transaction pool"""
-        for transaction in self.transaction_map.values():
-            if transaction.input["address"] == address:
-                return transaction
+        with self.lock:
+            for transaction_id in self.sender_map.get(address, ()):
+                return self.transaction_map[transaction_id]
 
     def transaction_data(self):
         """
@@ -18,20 +153,57 @@ class TransactionPool:
         serialized form
         """
 
-        return list(
-            map(
-                lambda transaction: transaction.serialize(),
-                self.transaction_map.values(),
+        with self.lock:
+            return list(
+                map(
+                    lambda transaction: transaction.serialize(),
+                    self.transaction_map.values(),
+                )
             )
-        )
+
+    def select_transactions(self, max_bytes=BLOCK_SIZE_LIMIT):
+        """
+        Assemble the serialized transactions of the next block.
+        Expired transactions are dropped first, then transactions are taken in priority
+        order as long as they fit in the max_bytes budget
+        """
+        with self.lock:
+            self.expire()
+
+            selected = []
+            remaining = max_bytes
+            for transaction_id in sorted(self.entries, key=self.entries.get):
+                size = self.entries[transaction_id][2]
+                if size <= remaining:
+                    selected.append(self.transaction_map[transaction_id].serialize())
+                    remaining -= size
+
+            return selected
+
+    def clear_block_transactions(self, blocks):
+        """
+        Delete the transactions of the given blocks from the transaction pool
+        """
+        with self.lock:
+            for block in blocks:
+                for transaction in block.data:
+                    self.remove_transaction(transaction["id"])
 
     def clear_blockchain_transactions(self, blockchain):
         """
-        Delete blockchain record transaction from the transaction pool
+        Delete blockchain record transaction from the transaction pool.
+        Only the blocks after the last cleared tip are walked, unless the chain was
+        replaced by one that does not contain that tip
         """
-        for block in blockchain.chain:
-            for transaction in block.data:
-                try:
-                    del self.transaction_map[transaction["id"]]
-                except KeyError:
-                    pass
+        chain = blockchain.chain
+        start = 0
+        with self.lock:
+            if (
+                0 < self.cleared_height <= len(chain)
+                and chain[self.cleared_height - 1].hash == self.cleared_hash
+            ):
+                start = self.cleared_height
+
+            self.clear_block_transactions(chain[start:])
+            self.cleared_height = len(chain)
+            self.cleared_hash = chain[-1].hash
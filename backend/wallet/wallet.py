@@ -1,15 +1,45 @@
 import uuid
 import json
-from backend.config import STARTING_BALANCE
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from backend.config import (
+    STARTING_BALANCE,
+    PUBLIC_KEY_CACHE_SIZE,
+    SIGNATURE_CACHE_SIZE,
+    VERIFY_WORKERS,
+    PARALLEL_VERIFY_THRESHOLD,
+)
+from backend.util.lru_cache import LRUCache
+from backend.util.metrics import Counter
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives.asymmetric.utils import (
     encode_dss_signature,
     decode_dss_signature,
+    Prehashed,
 )
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.exceptions import InvalidSignature
 
+# parsed public keys by their PEM string
+PUBLIC_KEY_CACHE = LRUCache(PUBLIC_KEY_CACHE_SIZE)
+# verification results by (PEM public key, sha-256 of the signed data, signature)
+SIGNATURE_CACHE = LRUCache(SIGNATURE_CACHE_SIZE)
+# worker processes of verify_batch by their number of workers, created on first use
+VERIFY_EXECUTORS = {}
+VERIFY_EXECUTORS_LOCK = threading.Lock()
+
+SIGNATURE_VERIFICATIONS = Counter(
+    "signature_verifications_total",
+    "Signatures verified, the ones found in the signature cache are not counted",
+    ["result"],
+)
+SIGNATURE_CACHE_HITS = Counter(
+    "signature_cache_hits_total", "Signatures found in the signature cache"
+)
+
 
 class Wallet:
     """
@@ -48,21 +78,136 @@ class Wallet:
 
     @staticmethod
     def verify(public_key, data, signature):
-        """verify the signature based on the data and original public key"""
-        deserialized_public_key = serialization.load_pem_public_key(
-            public_key.encode("utf-8"), default_backend()
-        )
+        """
+        verify the signature based on the data and original public key.
+        Results are cached, a signature that was already checked skips the EC work
+        """
         (r, s) = signature
+        digest = hashlib.sha256(json.dumps(data).encode("utf-8")).digest()
+        key = (public_key, digest, r, s)
+
+        verified = SIGNATURE_CACHE.get(key)
+        if verified is None:
+            verified = Wallet.verify_digest(public_key, digest, r, s)
+            SIGNATURE_CACHE.put(key, verified)
+            SIGNATURE_VERIFICATIONS.labels("valid" if verified else "invalid").inc()
+        else:
+            SIGNATURE_CACHE_HITS.inc()
+
+        return verified
+
+    @staticmethod
+    def verify_batch(signed_items, workers=None):
+        """
+        verify a list of (public_key, data, signature) items, returning a result per item.
+        Items missing from the signature cache are verified across worker processes when
+        there are enough of them, and their results are cached.
+
+        Malformed items are not verified and not cached, so verify raises their error
+        when the caller gets to them
+        """
+        workers = workers or VERIFY_WORKERS
+        results = [False] * len(signed_items)
+        pending = []
+
+        for i, (public_key, data, signature) in enumerate(signed_items):
+            try:
+                (r, s) = signature
+                digest = hashlib.sha256(json.dumps(data).encode("utf-8")).digest()
+                key = (public_key, digest, r, s)
+                verified = SIGNATURE_CACHE.get(key)
+            except (TypeError, ValueError):
+                continue
+
+            if verified is None:
+                pending.append((i, key))
+            else:
+                results[i] = verified
+                SIGNATURE_CACHE_HITS.inc()
+
+        keys = [key for _, key in pending]
+        verified = None
+        if workers > 1 and len(keys) >= PARALLEL_VERIFY_THRESHOLD:
+            verified = Wallet.verify_digests_parallel(keys, workers)
+        if verified is None:
+            verified = [Wallet.try_verify_digest(*key) for key in keys]
+
+        for (i, key), result in zip(pending, verified):
+            if result is None:
+                continue
+            SIGNATURE_CACHE.put(key, result)
+            results[i] = result
+            SIGNATURE_VERIFICATIONS.labels("valid" if result else "invalid").inc()
+
+        return results
+
+    @staticmethod
+    def verify_digests_parallel(keys, workers):
+        """
+        try_verify_digest of the (public_key, digest, r, s) keys across the worker
+        processes, or None when the workers died
+        """
+        with VERIFY_EXECUTORS_LOCK:
+            executor = VERIFY_EXECUTORS.get(workers)
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=workers)
+                VERIFY_EXECUTORS[workers] = executor
+
+        try:
+            return list(
+                executor.map(
+                    Wallet.try_verify_digest,
+                    *zip(*keys),
+                    chunksize=max(1, len(keys) // (workers * 4)),
+                )
+            )
+        except BrokenProcessPool:
+            with VERIFY_EXECUTORS_LOCK:
+                if VERIFY_EXECUTORS.get(workers) is executor:
+                    del VERIFY_EXECUTORS[workers]
+            return None
+
+    @staticmethod
+    def try_verify_digest(public_key, digest, r, s):
+        """verify_digest, or None when the public key or signature cannot be decoded"""
+        try:
+            return Wallet.verify_digest(public_key, digest, r, s)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def verify_digest(public_key, digest, r, s):
+        """verify the signature (r, s) of the sha-256 digest of the signed data"""
         try:
-            deserialized_public_key.verify(
+            Wallet.load_public_key(public_key).verify(
                 encode_dss_signature(r, s),
-                json.dumps(data).encode("utf-8"),
-                ec.ECDSA(hashes.SHA256()),
+                digest,
+                ec.ECDSA(Prehashed(hashes.SHA256())),
             )
             return True
         except InvalidSignature:
             return False
 
+    @staticmethod
+    def load_public_key(public_key):
+        """deserialize the PEM public key, reusing recently parsed keys"""
+        deserialized_public_key = PUBLIC_KEY_CACHE.get(public_key)
+        if deserialized_public_key is None:
+            deserialized_public_key = serialization.load_pem_public_key(
+                public_key.encode("utf-8"), default_backend()
+            )
+            PUBLIC_KEY_CACHE.put(public_key, deserialized_public_key)
+
+        return deserialized_public_key
+
+    @staticmethod
+    def cache_info():
+        """hit and miss counts of the public key and signature caches"""
+        return {
+            "public_keys": PUBLIC_KEY_CACHE.info(),
+            "signatures": SIGNATURE_CACHE.info(),
+        }
+
     @staticmethod
     def calculate_balance(blockchain, address):
         """
@@ -70,23 +215,13 @@ class Wallet:
         blockchain
 
         The balance is found by adding the output values that belongs to the address since the most
-        recent transaction by that address
+        recent transaction by that address. The blockchain keeps these balances in its ledger index
         """
 
-        balance = STARTING_BALANCE
-
         if not blockchain:
-            return balance
-
-        for block in blockchain.chain:
-            for transaction in block.data:
-                if transaction["input"]["address"] == address:
-                    # any thiem the address conducts an new transaction it reset
-                    # its balance
-                    balance = transaction["output"][address]
-                elif address in transaction["output"]:
-                    balance += transaction["output"][address]
-        return balance
+            return STARTING_BALANCE
+
+        return blockchain.balance(address)
 
 
 def main():